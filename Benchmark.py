@@ -0,0 +1,75 @@
+import sys
+import time
+
+from CPU import CPU
+from Memory import Memory
+
+# Microbenchmark for the register-specialised ALU handlers
+# Usage: python Benchmark.py [rom_file] [iterations]
+
+ITERATIONS = 100000
+
+CB_REGISTER_NAMES = ["B", "C", "D", "E", "H", "L", "(HL)", "A"]
+CB_ROTATE_NAMES = ["RLC", "RRC", "RL", "RR", "SLA", "SRA", "SWAP", "SRL"]
+CB_BIT_NAMES = ["BIT", "RES", "SET"]
+
+# INC/DEC opcodes of the main instruction set
+INC_DEC_OPCODES = [
+	0x03, 0x04, 0x05, 0x0B, 0x0C, 0x0D,
+	0x13, 0x14, 0x15, 0x1B, 0x1C, 0x1D,
+	0x23, 0x24, 0x25, 0x2B, 0x2C, 0x2D,
+	0x33, 0x34, 0x35, 0x3B, 0x3C, 0x3D
+]
+
+def CB_name(op):
+
+	reg = CB_REGISTER_NAMES[op & 0x07]
+	if op < 0x40:
+		return CB_ROTATE_NAMES[op >> 3] + " " + reg
+	return CB_BIT_NAMES[(op >> 6) - 1] + " " + str((op >> 3) & 0x07) + "," + reg
+
+def reset(cpu):
+
+	# Point HL into work RAM so (HL) operands never touch ROM
+	cpu.H = 0xC0
+	cpu.L = 0x00
+	cpu.SP = 0xDFF0
+
+# Time a handler, returns operations per second
+def ops_per_second(handler, iterations):
+
+	start = time.perf_counter()
+	for i in range(0, iterations):
+		handler()
+	return iterations / (time.perf_counter() - start)
+
+def main():
+
+	rom_file = sys.argv[1] if len(sys.argv) > 1 else "TETRIS.gb"
+	iterations = int(sys.argv[2]) if len(sys.argv) > 2 else ITERATIONS
+
+	cpu = CPU(Memory(rom_file))
+
+	total = 0
+	count = 0
+
+	for op in range(0, 0x100):
+		reset(cpu)
+		cpu.opcode = op
+		rate = ops_per_second(cpu.CB_execute, iterations)
+		print("CB " + hex(op)[2:].zfill(2).upper() + "  " + CB_name(op).ljust(12) + str(int(rate)).rjust(10) + " ops/s")
+		total += rate
+		count += 1
+
+	for op in INC_DEC_OPCODES:
+		reset(cpu)
+		function, length, cycles, debug_string = cpu.instructions[op]
+		rate = ops_per_second(function, iterations)
+		print("   " + hex(op)[2:].zfill(2).upper() + "  " + debug_string.ljust(12) + str(int(rate)).rjust(10) + " ops/s")
+		total += rate
+		count += 1
+
+	print("Mean: " + str(int(total / count)) + " ops/s")
+
+if __name__ == "__main__":
+	main()
@@ -1,3 +1,5 @@
+from textwrap import dedent
+
 from Memory import Memory
 
 INSTRUCTION_INDEX = 0
@@ -5,6 +7,12 @@ LENGTH_INDEX = 1
 CYCLES_INDEX = 2
 DEBUG_INDEX = 3
 
+# Flag register bits
+FLAG_Z = 0x80
+FLAG_N = 0x40
+FLAG_H = 0x20
+FLAG_C = 0x10
+
 class CPU:
 
 	def __init__(self, memory):
@@ -287,53 +295,59 @@ class CPU:
 			0xFF:	[self.RST_38H, 1, 16, "RST 38H"]
 		}
 
+		# CB Prefix Instruction Set
+		# Indexed by the opcode following 0xCB, each entry is a handler specialised for its bit and register
+		# Opcodes are laid out as [operation][bit][register] so the table can be built from the bit fields
+		self.CB_instructions = []
+		for op in range(0, 0x100):
+			reg = CB_REGISTERS[op & 0x07]
+			if op < 0x40:
+				name = CB_ROTATES[op >> 3] + "_" + reg
+			else:
+				name = CB_BIT_OPERATIONS[(op >> 6) - 1] + "_" + str((op >> 3) & 0x07) + "_" + reg
+			self.CB_instructions.append(getattr(self, name))
+
 		# 8-bit registers
 		self.A = 0x00
 		self.B = 0x00
 		self.C = 0x00
 		self.D = 0x00
 		self.E = 0x00
-		self.F = 0x00
 		self.H = 0x00
 		self.L = 0x00
 
+		# Flag register, Z N H C packed into the upper nibble
+		self.F = 0x00
+
 		# 16-bit registers
 		self.PC = 0x0000
 		self.SP = 0xFFFE
 
-		# Flags
-		self.flags = {
-			"Z": 0,
-			"N": 0,
-			"H": 0,
-			"C": 0
-		}
-
 		# Keep track of cycles
 		self.cycles = 0
 
-		# Interupts
-		self.INT_ENABLE = True
-
 		# The current operational code
 		self.opcode = 0x00
 
 		# Default instruction
-		self.instruction_params = [self.NOP, 1, 4]
 		self.instruction_function = self.NOP
 		self.instruction_length = 1
 		self.instruction_cycles = 4
 		self.debug_string = "NOP"
-		self.args = [0x00, 0x00, 0x00]
+		self.args = [0x00, 0x00]
 
 		# Initialize the memory (loads ROM into memory map)
 		self.memory = memory
 
-		self.DEBUG = True
+		# Bound once here, the handlers access memory on almost every instruction
+		if memory is not None:
+			self.read = memory.read
+			self.write = memory.write
 
 		self.PREFIX_CB = False
 
 	def print_registers(self):
+
 		A = "A=" + hex(self.A)[2:].zfill(2).upper()
 		B = "B=" + hex(self.B)[2:].zfill(2).upper()
 		C = "C=" + hex(self.C)[2:].zfill(2).upper()
@@ -344,7 +358,7 @@ class CPU:
 		SP = "SP=" + hex(self.SP)[2:].zfill(4).upper()
 		PC = "PC=" + hex(self.PC)[2:].zfill(4).upper()
 		Fl = "Z N H C"
-		F = str(self.flags["Z"]) + " " + str(self.flags["N"]) + " " + str(self.flags["H"]) + " " + str(self.flags["C"])
+		F = str((self.F & FLAG_Z) >> 7) + " " + str((self.F & FLAG_N) >> 6) + " " + str((self.F & FLAG_H) >> 5) + " " + str((self.F & FLAG_C) >> 4)
 		print("    " + A + " " + B + " " +  C + " " + D + " " +  E + " " +  H + " " +  L)
 		print("    " + SP)
 		print("    " + PC)
@@ -370,163 +384,56 @@ class CPU:
 
 		return ((self.H << 8) | (self.L)) & 0xFFFF
 
-	# Increment 8-bit register
-	def INC_REGISTER_8(self, register=""):
-
-		if register == "A": reg = self.A
-		if register == "B": reg = self.B
-		if register == "C": reg = self.C
-		if register == "D": reg = self.D
-		if register == "E": reg = self.E
-		if register == "H": reg = self.H
-		if register == "L": reg = self.L
-
-		# H - Set if carry from bit 3
-		if reg & 0x0F == 0x0F:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		reg = (reg + 1) & 0xFF
-
-		# Z - Set if result is zero
-		if reg == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
-		# N - Reset
-		self.flags["N"] = 0
-
-		if register == "A": self.A = reg
-		if register == "B": self.B = reg
-		if register == "C": self.C = reg
-		if register == "D": self.D = reg
-		if register == "E": self.E = reg
-		if register == "H": self.H = reg
-		if register == "L": self.L = reg
-
-	# Decrement 8-bit register
-	def DEC_REGISTER_8(self, register=""):
-
-		if register == "A": reg = self.A
-		if register == "B": reg = self.B
-		if register == "C": reg = self.C
-		if register == "D": reg = self.D
-		if register == "E": reg = self.E
-		if register == "H": reg = self.H
-		if register == "L": reg = self.L
-
-		# H - Set if not borrow from bit 4
-		if (reg & 0x0F) > 0x01:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		reg = (reg - 1) & 0xFF
-
-		# Z - Set if result is zero
-		if reg == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
-		if register == "A": self.A = reg
-		if register == "B": self.B = reg
-		if register == "C": self.C = reg
-		if register == "D": self.D = reg
-		if register == "E": self.E = reg
-		if register == "H": self.H = reg
-		if register == "L": self.L = reg
-
-	# Increment 16-bit registers
-	def INC_REGISTER_16(self, register=""):
-
-		if register == "BC": reg = self.get_BC()
-		if register == "DE": reg = self.get_DE()
-		if register == "HL": reg = self.get_HL()
-		if register == "SP": reg = self.SP
-
-		reg = (reg + 1) & 0xFFFF
-
-		if register == "BC":
-			self.C = reg & 0x00FF
-			self.B = (reg & 0xFF00) >> 8
-		if register == "DE":
-			self.E = reg & 0x00FF
-			self.D = (reg & 0xFF00) >> 8
-		if register == "HL":
-			self.L = reg & 0x00FF
-			self.H = (reg & 0xFF00) >> 8
-		if register == "SP":
-			self.SP = reg
-
-	# Decrement 16-bit registers
-	def DEC_REGISTER_16(self, register = ""):
-
-		if register == "BC": reg = self.get_BC()
-		if register == "DE": reg = self.get_DE()
-		if register == "HL": reg = self.get_HL()
-		if register == "SP": reg = self.SP
-
-		reg = (reg - 1) & 0xFFFF
-
-		if register == "BC":
-			self.C = reg & 0x00FF
-			self.B = (reg & 0xFF00) >> 8
-		if register == "DE":
-			self.E = reg & 0x00FF
-			self.D = (reg & 0xFF00) >> 8
-		if register == "HL":
-			self.L = reg & 0x00FF
-			self.H = (reg & 0xFF00) >> 8
-		if register == "SP":
-			self.SP = reg
-
 	# Pop a byte from the stack
 	def POP(self):
 
 		self.SP += 1
-		val = self.memory.read(self.SP)
+		val = self.read(self.SP)
 		return val
 
 	# Push a byte to the stack
 	def PUSH(self, byte):
 
-		self.memory.write(self.SP, byte)
+		self.write(self.SP, byte)
 		self.SP -= 1
 
 	# Fetch the next opcode
 	def fetch(self):
 
-		self.opcode = self.memory.read(self.PC)
+		self.opcode = self.read(self.PC)
 
 	# Decode and acquire the arguments
+	# Decoded instructions are cached per address, so code that runs repeatedly skips this
+	# The cache also fetches, so calling fetch() first is not needed
 	def decode(self):
 
-		# Attempt to get the instruction
-		try:
-			self.instruction_params = self.instructions[self.opcode]
-		except:
-			print("***NOT IN INSTRUCTION SET***")
-			print("Opcode : 0x" + hex(self.opcode)[2:].zfill(2).upper())
-
-		# Get the parameters of the instruction
-		self.instruction_function = self.instruction_params[INSTRUCTION_INDEX]
-		self.instruction_length = self.instruction_params[LENGTH_INDEX]
-		self.instruction_cycles = self.instruction_params[CYCLES_INDEX]
-		self.debug_string = self.instruction_params[DEBUG_INDEX]
+		entry = self.memory.decoded[self.PC]
+		if entry is None:
+			entry = self.decode_instruction(self.PC)
 
-		# Get the arguments of the instruction and increment PC
-		for i in range(0, self.instruction_length-1):
-			self.args[i] = self.memory.read(self.PC + 1 + i)
+		self.opcode, self.instruction_function, self.instruction_length, self.instruction_cycles, self.debug_string, self.args = entry
 
 		# Increment the PC accordingly
 		self.PC += self.instruction_length
 
+	# Decode the instruction at address and store it in the cache
+	# (opcode, function, length, clock cycles, assembly string, arguments)
+	def decode_instruction(self, address):
+
+		opcode = self.read(address)
+		params = self.instructions[opcode]
+		length = params[LENGTH_INDEX]
+
+		# Get the arguments of the instruction
+		args = [0x00, 0x00]
+		for i in range(0, length-1):
+			args[i] = self.read(address + 1 + i)
+
+		entry = (opcode, params[INSTRUCTION_INDEX], length, params[CYCLES_INDEX], params[DEBUG_INDEX], args)
+		self.memory.decoded[address] = entry
+		self.memory.watch(address, address + length)
+		return entry
+
 	# Execute the next instruction
 	def execute(self):
 
@@ -541,9 +448,6 @@ class CPU:
 			self.fetch()
 			self.CB_execute()
 
-			if self.DEBUG:
-				print("CB OPCODE : " + hex(self.opcode)[2:].zfill(2).upper())
-
 			# The last two bytes read were Prefix CB and the special opcode
 			# With this, we are pointing to the next instruction
 			self.PC += 1
@@ -552,6 +456,43 @@ class CPU:
 
 			self.PREFIX_CB = False
 
+	# Called between instructions when memory.interrupt_pending is set
+	# Takes the highest priority pending interrupt, returns whether one was taken
+	def interrupt(self):
+
+		memory = self.memory
+
+		# After an EI, the instruction that follows runs before interrupts are enabled
+		if memory.interrupt_enabling:
+			if memory.interrupt_enabling == 1:
+				memory.interrupt_enabling = 2
+				return False
+			memory.enable_interrupts(False)
+
+		# Halted until a request comes in, which wakes the CPU even with IME clear
+		if memory.halted:
+			if not memory.wake_requested():
+				return False
+			memory.resume()
+
+		pending = memory.interrupt_pending
+		if not pending:
+			return False
+
+		# The lowest bit is the highest priority, VBlank first
+		interrupt = pending & -pending
+
+		memory.bytes[0xFF0F] &= ~interrupt & 0xFF
+		memory.disable_interrupts()
+
+		# Same as a call to the interrupt's vector, 0x40 for VBlank up to 0x60 for the joypad
+		self.PUSH((self.PC & 0xFF00) >> 8)
+		self.PUSH(self.PC & 0x00FF)
+		self.PC = 0x40 + (interrupt.bit_length() - 1) * 8
+		self.cycles += 20
+
+		return True
+
 	# 0xXX - Kill operation
 	# - - - -
 	def KILL(self):
@@ -576,25 +517,41 @@ class CPU:
 	# - - - -
 	def LD_M_BC_A(self):
 
-		self.memory.write(self.get_BC(), self.A)
+		self.write(self.get_BC(), self.A)
 
 	# 0x03 - Increment registers BC
 	# - - - -
 	def INC_BC(self):
 
-		self.INC_REGISTER_16("BC")
+		BC = (self.get_BC() + 1) & 0xFFFF
+		self.C = BC & 0x00FF
+		self.B = (BC & 0xFF00) >> 8
 
 	# 0x04 - Increment register B
 	# Z 0 H -
 	def INC_B(self):
 
-		self.INC_REGISTER_8("B")
+		val = self.B
+		self.B = (val + 1) & 0xFF
+
+		# Z - Set if result is zero
+		# N - Reset
+		# H - Set if carry from bit 3
+		# C - Not affected
+		self.F = (self.F & FLAG_C) | (FLAG_Z if self.B == 0 else 0) | (FLAG_H if val & 0x0F == 0x0F else 0)
 
 	# 0x05 - Decrement register B
 	# Z 1 H -
 	def DEC_B(self):
 
-		self.DEC_REGISTER_8("B")
+		val = self.B
+		self.B = (val - 1) & 0xFF
+
+		# Z - Set if result is zero
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Not affected
+		self.F = (self.F & FLAG_C) | (FLAG_Z if self.B == 0 else 0) | FLAG_N | (FLAG_H if val & 0x0F == 0x00 else 0)
 
 	# 0x06 - Load register B immediate 8-bit data
 	# - - - -
@@ -603,80 +560,79 @@ class CPU:
 		self.B = self.args[0]
 
 	# 0x07 - Rotate A left, old bit 7 to carry flag
-	# Z 0 0 C
+	# 0 0 0 C
 	def RLCA(self):
 
 		# C - Contains old bit 7 data
-		self.flags["C"] = (self.A & 0x80) >> 8
-
-		self.A = (self.A << 1) & 0xFF
-		self.A |= self.flags["C"]
-
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		carry = self.A >> 7
+		self.A = ((self.A << 1) | carry) & 0xFF
 
+		# Z - Reset
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
+		self.F = FLAG_C if carry else 0
 
 	# 0x08 - Load into memory address (16-bit data) register SP
 	# - - - -
 	def LD_M_d16_SP(self):
 
-		self.memory.write((self.args[1] << 8) | self.args[0], self.SP & 0x00FF)
-		self.memory.write(((self.args[1] << 8) | self.args[0]) + 1, (self.SP & 0xFF00) >> 8)
+		self.write((self.args[1] << 8) | self.args[0], self.SP & 0x00FF)
+		self.write(((self.args[1] << 8) | self.args[0]) + 1, (self.SP & 0xFF00) >> 8)
 	# 0x09 - Add into registers HL, HL+BC
 	# - 0 H C
 	def ADD_HL_BC(self):
 
-		# H - Set if carry from bit 11
-		if (((self.get_HL() & 0xFFFF) + (self.get_BC() & 0xFFFF)) & 0x1000) == 0x1000:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 15
-		if (((self.get_HL() & 0xFFFF) + (self.get_BC() & 0xFFFF)) & 0x8000) == 0x8000:
-			self.flags["C"] = 1
-		else:
-			self.flags["H"] = 0
-
 		HL = self.get_HL()
-		HL = (HL + self.get_BC()) & 0xFFFF
-		self.L = HL & 0x00FF;
-		self.H = (HL & 0xFF00) >> 8
+		val = self.get_BC()
+		result = HL + val
+		self.L = result & 0x00FF
+		self.H = (result & 0xFF00) >> 8
 
+		# Z - Not affected
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 11
+		# C - Set if carry from bit 15
+		self.F = (self.F & FLAG_Z) | (FLAG_H if (HL & 0x0FFF) + (val & 0x0FFF) > 0x0FFF else 0) | (FLAG_C if result > 0xFFFF else 0)
 
 	# 0x0A - Load register A data at memory address (BC)
 	# - - - -
 	def LD_A_M_BC(self):
 
-		self.A = self.memory.read(self.get_BC())
+		self.A = self.read(self.get_BC())
 
 	# 0x0B - Decrement registers BC
 	# - - - -
 	def DEC_BC(self):
 
-		self.DEC_REGISTER_16("BC")
+		BC = (self.get_BC() - 1) & 0xFFFF
+		self.C = BC & 0x00FF
+		self.B = (BC & 0xFF00) >> 8
 
 	# 0x0C - Increment register C
 	# Z 0 H -
 	def INC_C(self):
 
-		self.INC_REGISTER_8("C")
+		val = self.C
+		self.C = (val + 1) & 0xFF
+
+		# Z - Set if result is zero
+		# N - Reset
+		# H - Set if carry from bit 3
+		# C - Not affected
+		self.F = (self.F & FLAG_C) | (FLAG_Z if self.C == 0 else 0) | (FLAG_H if val & 0x0F == 0x0F else 0)
 
 	# 0x0D - Decrement register C
 	# Z 1 H -
 	def DEC_C(self):
 
-		self.DEC_REGISTER_8("C")
+		val = self.C
+		self.C = (val - 1) & 0xFF
+
+		# Z - Set if result is zero
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Not affected
+		self.F = (self.F & FLAG_C) | (FLAG_Z if self.C == 0 else 0) | FLAG_N | (FLAG_H if val & 0x0F == 0x00 else 0)
 
 	# 0x0E - Load register C immediate 8-bit data
 	# - - - -
@@ -689,29 +645,19 @@ class CPU:
 	def RRCA(self):
 
 		# C - Contains old bit 0 data
-		self.flags["C"] = self.A & 0x01
-
-		self.A = (self.A >> 1)
-		self.A |= (self.flags["C"] << 8)
-
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		carry = self.A & 0x01
+		self.A = (self.A >> 1) | (carry << 7)
 
+		# Z - Reset
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
+		self.F = FLAG_C if carry else 0
 
 	# 0x10 - Halt CPU & LCD display until button pressed
 	# - - - -
-	def STOP():
+	def STOP(self):
 
-		print("***STOP***")
-		while True: pass
+		self.memory.halt(True)
 
 	# 0x11 - Load into registers DE immediate 16-bit data
 	# - - - -
@@ -724,25 +670,41 @@ class CPU:
 	# - - - -
 	def LD_M_DE_A(self):
 
-		self.memory.write(self.get_DE(), self.A)
+		self.write(self.get_DE(), self.A)
 
 	# 0x13 - Increment registers DE
 	# - - - -
 	def INC_DE(self):
 
-		self.INC_REGISTER_16("DE")
+		DE = (self.get_DE() + 1) & 0xFFFF
+		self.E = DE & 0x00FF
+		self.D = (DE & 0xFF00) >> 8
 
 	# 0x14 - Increment register D
 	# Z 0 H -
 	def INC_D(self):
 
-		self.INC_REGISTER_8("D")
+		val = self.D
+		self.D = (val + 1) & 0xFF
+
+		# Z - Set if result is zero
+		# N - Reset
+		# H - Set if carry from bit 3
+		# C - Not affected
+		self.F = (self.F & FLAG_C) | (FLAG_Z if self.D == 0 else 0) | (FLAG_H if val & 0x0F == 0x0F else 0)
 
 	# 0x15 - Decrement register B
 	# Z 1 H -
 	def DEC_D(self):
 
-		self.DEC_REGISTER_8("D")
+		val = self.D
+		self.D = (val - 1) & 0xFF
+
+		# Z - Set if result is zero
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Not affected
+		self.F = (self.F & FLAG_C) | (FLAG_Z if self.D == 0 else 0) | FLAG_N | (FLAG_H if val & 0x0F == 0x00 else 0)
 
 	# 0x16 - Load register D immediate 8-bit data
 	# - - - -
@@ -754,25 +716,16 @@ class CPU:
 	# 0 0 0 C
 	def RLA(self):
 
-		C = self.flags["C"]
+		C = (self.F & FLAG_C) >> 4
 
 		# C - Contains old bit 7 data
-		self.flags["C"] = (self.A & 0x80) >> 7
-
-		self.A = (self.A << 1) & 0xFF
-		self.A |= C
-
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		carry = self.A >> 7
+		self.A = ((self.A << 1) | C) & 0xFF
 
+		# Z - Reset
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
+		self.F = FLAG_C if carry else 0
 
 	# 0x18 - Add signed data to current address and jump to it
 	# - - - -
@@ -788,49 +741,57 @@ class CPU:
 	# - 0 H C
 	def ADD_HL_DE(self):
 
-		# H - Set if carry from bit 11
-		if (((self.get_HL() & 0xFFFF) + (self.get_DE() & 0xFFFF)) & 0x1000) == 0x1000:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# H - Set if carry from bit 15
-		if (((self.get_HL() & 0xFFFF) + (self.get_DE() & 0xFFFF)) & 0x8000) == 0x8000:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
 		HL = self.get_HL()
-		HL = (HL + self.get_DE()) & 0xFFFF
-		self.L = HL & 0x00FF;
-		self.H = (HL & 0xFF00) >> 8
+		val = self.get_DE()
+		result = HL + val
+		self.L = result & 0x00FF
+		self.H = (result & 0xFF00) >> 8
 
+		# Z - Not affected
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 11
+		# C - Set if carry from bit 15
+		self.F = (self.F & FLAG_Z) | (FLAG_H if (HL & 0x0FFF) + (val & 0x0FFF) > 0x0FFF else 0) | (FLAG_C if result > 0xFFFF else 0)
 
 	# 0x1A - Load register A data at memory address (DE)
 	# - - - -
 	def LD_A_M_DE(self):
 
-		self.A = self.memory.read(self.get_DE())
+		self.A = self.read(self.get_DE())
 
 	# 0x1B - Decrement registers DE
 	# - - - -
 	def DEC_DE(self):
 
-		self.DEC_REGISTER_16("DE")
+		DE = (self.get_DE() - 1) & 0xFFFF
+		self.E = DE & 0x00FF
+		self.D = (DE & 0xFF00) >> 8
 
 	# 0x1C - Increment register E
 	# Z 0 H -
 	def INC_E(self):
 
-		self.INC_REGISTER_8("E")
+		val = self.E
+		self.E = (val + 1) & 0xFF
+
+		# Z - Set if result is zero
+		# N - Reset
+		# H - Set if carry from bit 3
+		# C - Not affected
+		self.F = (self.F & FLAG_C) | (FLAG_Z if self.E == 0 else 0) | (FLAG_H if val & 0x0F == 0x0F else 0)
 
 	# 0x1D - Decrement register E
 	# Z 1 H -
 	def DEC_E(self):
 
-		self.DEC_REGISTER_8("E")
+		val = self.E
+		self.E = (val - 1) & 0xFF
+
+		# Z - Set if result is zero
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Not affected
+		self.F = (self.F & FLAG_C) | (FLAG_Z if self.E == 0 else 0) | FLAG_N | (FLAG_H if val & 0x0F == 0x00 else 0)
 
 	# 0x1E - Load register E immediate 8-bit data
 	# - - - -
@@ -842,31 +803,22 @@ class CPU:
 	# 0 0 0 C
 	def RRA(self):
 
-		C = self.flags["C"]
+		C = (self.F & FLAG_C) >> 4
 
 		# C - Contains old bit 0 data
-		self.flags["C"] = self.A & 0x01
-
-		self.A = (self.A >> 1) & 0xFF
-		self.A |= (C << 8)
-
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		carry = self.A & 0x01
+		self.A = (self.A >> 1) | (C << 7)
 
+		# Z - Reset
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
+		self.F = FLAG_C if carry else 0
 
 	# 0x20 - Jump if Z flag is 0
 	# - - - -
 	def JR_NZ_r8(self):
 
-		if self.flags["Z"] == 0:
+		if not self.F & FLAG_Z:
 			if self.args[0] & 0x80:
 				val = -0x100 + self.args[0]
 				self.PC += val
@@ -884,26 +836,44 @@ class CPU:
 	# - - - -
 	def LD_M_HLP_A(self):
 
-		self.memory.write(self.get_HL(), self.A)
-		self.INC_REGISTER_16("HL")
+		self.write(self.get_HL(), self.A)
+		HL = (self.get_HL() + 1) & 0xFFFF
+		self.L = HL & 0x00FF
+		self.H = (HL & 0xFF00) >> 8
 
 	# 0x23 - Increment registers HL
 	# - - - -
 	def INC_HL(self):
 
-		self.INC_REGISTER_16("HL")
+		HL = (self.get_HL() + 1) & 0xFFFF
+		self.L = HL & 0x00FF
+		self.H = (HL & 0xFF00) >> 8
 
 	# 0x24 - Increment register H
 	# Z 0 H -
 	def INC_H(self):
 
-		self.INC_REGISTER_8("H")
+		val = self.H
+		self.H = (val + 1) & 0xFF
+
+		# Z - Set if result is zero
+		# N - Reset
+		# H - Set if carry from bit 3
+		# C - Not affected
+		self.F = (self.F & FLAG_C) | (FLAG_Z if self.H == 0 else 0) | (FLAG_H if val & 0x0F == 0x0F else 0)
 
 	# 0x25 - Decrement register H
 	# Z 1 H -
 	def DEC_H(self):
 
-		self.DEC_REGISTER_8("H")
+		val = self.H
+		self.H = (val - 1) & 0xFF
+
+		# Z - Set if result is zero
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Not affected
+		self.F = (self.F & FLAG_C) | (FLAG_Z if self.H == 0 else 0) | FLAG_N | (FLAG_H if val & 0x0F == 0x00 else 0)
 
 	# 0x26 - Load register H immediate 8-bit data
 	#  - - - -
@@ -918,36 +888,34 @@ class CPU:
 		# http://forums.nesdev.com/viewtopic.php?t=9088
 
 		A = self.A
+		F = self.F
 
-		if self.flags["N"]:
-			if self.flags["H"] or ((A & 0x0F) > 9):
-				A += 0x06
-			if self.flags["C"] or (A > 0x9F):
-				A += 0x60
-		else:
-			if self.flags["H"]:
-				A = (A - 6) & 0xFF
-			if self.flags["C"]:
+		if F & FLAG_N:
+			if F & FLAG_C:
 				A -= 0x60
-
-		self.flags["H"] = 0
-		self.flags["Z"] = 0
-
-		if ((A & 0x100) == 0x100):
-			self.flags["C"] = 1
+			if F & FLAG_H:
+				A -= 0x06
+		else:
+			if (F & FLAG_C) or (A > 0x99):
+				A += 0x60
+				F |= FLAG_C
+			if (F & FLAG_H) or ((A & 0x0F) > 0x09):
+				A += 0x06
 
 		self.A = A & 0xFF
 
-		if self.A == 0:
-			self.flags["Z"] = 1
+		# Z - Set if result is 0
+		# H - Reset
+		# C - Set if adjustment carried out of the high nibble
+		self.F = (F & (FLAG_N | FLAG_C)) | (FLAG_Z if self.A == 0 else 0)
 
 	# 0x28 - Jump if Z flag is 1
 	# - - - -
 	def JR_Z_r8(self):
 
-		if self.flags["Z"] == 1:
+		if self.F & FLAG_Z:
 			if self.args[0] & 0x80:
-				val = -0x100 + args[0]
+				val = -0x100 + self.args[0]
 				self.PC += val
 			else:
 				self.PC += self.args[0]
@@ -956,50 +924,60 @@ class CPU:
 	#- 0 H C
 	def ADD_HL_HL(self):
 
-		# H - Set if carry from bit 11
-		if (((self.get_HL() & 0xFFFF) + (self.get_HL() & 0xFFFF)) & 0x1000) == 0x1000:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# H - Set if carry from bit 15
-		if (((self.get_HL() & 0xFFFF) + (self.get_HL() & 0xFFFF)) & 0x8000) == 0x8000:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
 		HL = self.get_HL()
-		HL = (HL + HL) & 0xFFFF
-		self.L = HL & 0x00FF;
-		self.H = (HL & 0xFF00) >> 8
+		val = HL
+		result = HL + val
+		self.L = result & 0x00FF
+		self.H = (result & 0xFF00) >> 8
 
+		# Z - Not affected
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 11
+		# C - Set if carry from bit 15
+		self.F = (self.F & FLAG_Z) | (FLAG_H if (HL & 0x0FFF) + (val & 0x0FFF) > 0x0FFF else 0) | (FLAG_C if result > 0xFFFF else 0)
 
 	# 0x2A - Load register A data at memory address (HL), increment HL
 	# - - - -
 	def LD_A_M_HLP(self):
 
-		self.A = self.memory.read(self.get_HL())
-		self.INC_REGISTER_16("HL")
+		self.A = self.read(self.get_HL())
+		HL = (self.get_HL() + 1) & 0xFFFF
+		self.L = HL & 0x00FF
+		self.H = (HL & 0xFF00) >> 8
 
 	# 0x2B - Decrement registers HL
 	# - - - -
 	def DEC_HL(self):
 
-		self.DEC_REGISTER_16("HL")
+		HL = (self.get_HL() - 1) & 0xFFFF
+		self.L = HL & 0x00FF
+		self.H = (HL & 0xFF00) >> 8
 
 	# 0x2C - Increment register L
 	# Z 0 H -
 	def INC_L(self):
 
-		self.INC_REGISTER_8("L")
+		val = self.L
+		self.L = (val + 1) & 0xFF
+
+		# Z - Set if result is zero
+		# N - Reset
+		# H - Set if carry from bit 3
+		# C - Not affected
+		self.F = (self.F & FLAG_C) | (FLAG_Z if self.L == 0 else 0) | (FLAG_H if val & 0x0F == 0x0F else 0)
 
 	# 0x2D - Decrement register L
 	# Z 1 H -
 	def DEC_L(self):
 
-		self.DEC_REGISTER_8("L")
+		val = self.L
+		self.L = (val - 1) & 0xFF
+
+		# Z - Set if result is zero
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Not affected
+		self.F = (self.F & FLAG_C) | (FLAG_Z if self.L == 0 else 0) | FLAG_N | (FLAG_H if val & 0x0F == 0x00 else 0)
 
 	# 0x2E - Load register L immediate 8-bit data
 	# - - - -
@@ -1015,18 +993,16 @@ class CPU:
 		self.A &= 0xFF
 
 		# N - Set
-		self.flags["N"] = 1
-
 		# H - Set
-		self.flags["H"] = 1
+		self.F |= FLAG_N | FLAG_H
 
 	# 0x30 -
 	# - - - -
 	def JR_NC_r8(self):
 
-		if self.flags["C"] == 0:
+		if not self.F & FLAG_C:
 			if self.args[0] & 0x80:
-				val = -0x100 + args[0]
+				val = -0x100 + self.args[0]
 				self.PC += val
 			else:
 				self.PC += self.args[0]
@@ -1041,7 +1017,7 @@ class CPU:
 	# - - - -
 	def LD_M_HLM_A(self):
 
-		self.memory.write(self.get_HL(), self.A)
+		self.write(self.get_HL(), self.A)
 		HL = self.get_HL()
 		HL = (HL - 1) & 0xFFFF
 		self.L = HL & 0x00FF
@@ -1057,72 +1033,54 @@ class CPU:
 	# Z 0 H -
 	def INC_M_HL(self):
 
-		val = self.memory.read(self.get_HL())
-
-		# H - Set if carry from bit 3
-		if (((val & 0xFF) + (0x01 & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		val = (val + 1) & 0xFF
-		self.memory.write(self.get_HL(), val)
+		HL = self.get_HL()
+		val = self.read(HL)
+		result = (val + 1) & 0xFF
+		self.write(HL, result)
 
 		# Z - Set if result is 0
-		if val == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Not affected
+		self.F = (self.F & FLAG_C) | (FLAG_Z if result == 0 else 0) | (FLAG_H if val & 0x0F == 0x0F else 0)
 
 	# 0x35 -
 	# Z 1 H -
 	def DEC_M_HL(self):
 
-		val = self.memory.read(self.get_HL())
-
-		# H - Set if no borrow from bit 4
-		if (val & 0x0F) > 1:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-
-		val = (val - 1) & 0xFF
-		self.memory.write(self.get_HL(), val)
+		HL = self.get_HL()
+		val = self.read(HL)
+		result = (val - 1) & 0xFF
+		self.write(HL, result)
 
 		# Z - Set if result is 0
-		if val == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Set
-		self.flags["N"] = 1
+		# H - Set if borrow from bit 4
+		# C - Not affected
+		self.F = (self.F & FLAG_C) | (FLAG_Z if result == 0 else 0) | FLAG_N | (FLAG_H if val & 0x0F == 0x00 else 0)
 
 	# 0x36 -
 	# - - - -
 	def LD_M_HL_d8(self):
 
-		self.memory.write(self.get_HL(), self.args[0])
+		self.write(self.get_HL(), self.args[0])
 
 	# 0x37 - Set carry flag
 	# - 0 0 1
 	def SCF(self):
 
-		self.flags["C"] = 1
-		self.flags["N"] = 0
-		self.flags["H"] = 0
+		# N - Reset
+		# H - Reset
+		# C - Set
+		self.F = (self.F & FLAG_Z) | FLAG_C
 
 	# 0x38 -
 	# - - - -
 	def JR_C_r8(self):
 
-		if self.flags["C"] == 1:
+		if self.F & FLAG_C:
 			if self.args[0] & 0x80:
-				val = -0x100 + args[0]
+				val = -0x100 + self.args[0]
 				self.PC += val
 			else:
 				self.PC += self.args[0]
@@ -1132,30 +1090,22 @@ class CPU:
 	def ADD_HL_SP(self):
 
 		HL = self.get_HL()
-		SP = self.get_SP()
-
-		# H - Set if carry from bit 11
-		if (((HL & 0xFFFF) + (SP & 0xFFFF)) & 0x1000) == 0x1000:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# H - Set if carry from bit 15
-		if (((HL & 0xFFFF) + (SP & 0xFFFF)) & 0x8000) == 0x8000:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		HL = (HL + SP) & 0xFFFF
+		val = self.SP
+		result = HL + val
+		self.L = result & 0x00FF
+		self.H = (result & 0xFF00) >> 8
 
+		# Z - Not affected
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 11
+		# C - Set if carry from bit 15
+		self.F = (self.F & FLAG_Z) | (FLAG_H if (HL & 0x0FFF) + (val & 0x0FFF) > 0x0FFF else 0) | (FLAG_C if result > 0xFFFF else 0)
 
 	# 0x3A -
 	# - - - -
 	def LD_A_M_HLM(self):
 
-		self.A = self.memory.read(self.get_HL())
+		self.A = self.read(self.get_HL())
 		HL = self.get_HL()
 		HL = (HL - 1) & 0xFFFF
 		self.L = HL & 0x00FF
@@ -1171,13 +1121,27 @@ class CPU:
 	# Z 0 H -
 	def INC_A(self):
 
-		self.INC_REGISTER_8("A")
+		val = self.A
+		self.A = (val + 1) & 0xFF
+
+		# Z - Set if result is zero
+		# N - Reset
+		# H - Set if carry from bit 3
+		# C - Not affected
+		self.F = (self.F & FLAG_C) | (FLAG_Z if self.A == 0 else 0) | (FLAG_H if val & 0x0F == 0x0F else 0)
 
 	# 0x3D -
 	# Z 1 H -
 	def DEC_A(self):
 
-		self.DEC_REGISTER_8("A")
+		val = self.A
+		self.A = (val - 1) & 0xFF
+
+		# Z - Set if result is zero
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Not affected
+		self.F = (self.F & FLAG_C) | (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if val & 0x0F == 0x00 else 0)
 
 	# 0x3E -
 	# - - - -
@@ -1189,16 +1153,10 @@ class CPU:
 	# - 0 0 C
 	def CCF(self):
 
-		if self.flags["C"] == 1:
-			self.flags["C"] = 0
-		else:
-			self.flags["C"] = 1
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
+		# C - Complemented
+		self.F = (self.F & (FLAG_Z | FLAG_C)) ^ FLAG_C
 
 	# 0x40 -
 	# - - - -
@@ -1240,7 +1198,7 @@ class CPU:
 	# - - - -
 	def LD_B_M_HL(self):
 
-		self.B = self.memory.read(self.get_HL())
+		self.B = self.read(self.get_HL())
 
 	# 0x47 -
 	# - - - -
@@ -1288,7 +1246,7 @@ class CPU:
 	# - - - -
 	def LD_C_M_HL(self):
 
-		self.C = self.memory.read(self.get_HL())
+		self.C = self.read(self.get_HL())
 
 	# 0x4F -
 	# - - - -
@@ -1336,7 +1294,7 @@ class CPU:
 	# - - - -
 	def LD_D_M_HL(self):
 
-		self.D = self.memory.read(self.get_HL())
+		self.D = self.read(self.get_HL())
 
 	# 0x57 -
 	# - - - -
@@ -1384,7 +1342,7 @@ class CPU:
 	# - - - -
 	def LD_E_M_HL(self):
 
-		self.E = self.memory.read(self.get_HL())
+		self.E = self.read(self.get_HL())
 
 	# 0x5F -
 	# - - - -
@@ -1432,7 +1390,7 @@ class CPU:
 	# - - - -
 	def LD_H_M_HL(self):
 
-		self.H = self.memory.read(self.get_HL())
+		self.H = self.read(self.get_HL())
 
 	# 0x67 -
 	# - - - -
@@ -1480,7 +1438,7 @@ class CPU:
 	# - - - -
 	def LD_L_M_HL(self):
 
-		self.L = self.memory.read(self.get_HL())
+		self.L = self.read(self.get_HL())
 
 	# 0x6F -
 	# 		- - - -
@@ -1492,50 +1450,49 @@ class CPU:
 	# - - - -
 	def LD_M_HL_B(self):
 
-		self.memory.write(self.get_HL(), self.B)
+		self.write(self.get_HL(), self.B)
 
 	# 0x71 -
 	# - - - -
 	def LD_M_HL_C(self):
 
-		self.memory.write(self.get_HL(), self.C)
+		self.write(self.get_HL(), self.C)
 
 	# 0x72 -
 	# - - - -
 	def LD_M_HL_D(self):
 
-		self.memory.write(self.get_HL(), self.D)
+		self.write(self.get_HL(), self.D)
 
 	# 0x73 -
 	# - - - -
 	def LD_M_HL_E(self):
 
-		self.memory.write(self.get_HL(), self.E)
+		self.write(self.get_HL(), self.E)
 
 	# 0x74 -
 	# - - - -
 	def LD_M_HL_H(self):
 
-		self.memory.write(self.get_HL(), self.H)
+		self.write(self.get_HL(), self.H)
 
 	# 0x75 -
 	# - - - -
 	def LD_M_HL_L(self):
 
-		self.memory.write(self.get_HL(), self.L)
+		self.write(self.get_HL(), self.L)
 
-	# 0x76 -
+	# 0x76 - Halt CPU until an interrupt is requested
 	# - - - -
 	def HALT(self):
 
-		print("***HALT***")
-		while True: pass
+		self.memory.halt(False)
 
 	# 0x77 -
 	# - - - -
 	def LD_M_HL_A(self):
 
-		self.memory.write(self.get_HL(), self.A)
+		self.write(self.get_HL(), self.A)
 
 	# 0x78 -
 	# - - - -
@@ -1577,7 +1534,7 @@ class CPU:
 	# - - - -
 	def LD_A_M_HL(self):
 
-		self.A = self.memory.read(self.get_HL())
+		self.A = self.read(self.get_HL())
 
 	# 0x7F -
 	# - - - -
@@ -1590,1133 +1547,594 @@ class CPU:
 	def ADD_A_B(self):
 
 		A = self.A
-		B = self.B
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + (B & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + (B & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + B) & 0xFF
-		self.A = A
+		val = self.B
+		result = A + val
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0x81 -
 	# Z 0 H C
 	def ADD_A_C(self):
 
 		A = self.A
-		C = self.C
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + (C & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + (C & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + C) & 0xFF
-		self.A = A
+		val = self.C
+		result = A + val
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0x82 -
 	# Z 0 H C
 	def ADD_A_D(self):
 
 		A = self.A
-		D = self.D
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + (D & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + (D & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + D) & 0xFF
-		self.A = A
+		val = self.D
+		result = A + val
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0x83 -
 	# Z 0 H C
 	def ADD_A_E(self):
 
 		A = self.A
-		E = self.E
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + (E & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + (E & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + E) & 0xFF
-		self.A = A
+		val = self.E
+		result = A + val
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0x84 -
 	# Z 0 H C
 	def ADD_A_H(self):
 
 		A = self.A
-		H = self.H
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + (H & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + (H & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + H) & 0xFF
-		self.A = A
+		val = self.H
+		result = A + val
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0x85 -
 	# Z 0 H C
 	def ADD_A_L(self):
 
 		A = self.A
-		L = self.L
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + (L & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + (L & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + L) & 0xFF
-		self.A = A
+		val = self.L
+		result = A + val
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0x86 -
 	# Z 0 H C
 	def ADD_A_M_HL(self):
 
 		A = self.A
-		HL = self.memory.read(self.get_HL())
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + (HL & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + (HL & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + HL) & 0xFF
-		self.A = A
+		val = self.read(self.get_HL())
+		result = A + val
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0x87 -
 	# Z 0 H C
 	def ADD_A_A(self):
 
 		A = self.A
-		A2 = self.A
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + (A2 & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + (A2 & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + A2) & 0xFF
-		self.A = A
+		val = self.A
+		result = A + val
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0x88 -
 	# Z 0 H C
 	def ADC_A_B(self):
 
 		A = self.A
-		B = self.B
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + ((B+self.flags["C"]) & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + ((B+self.flags["C"]) & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + B + self.flags["C"]) & 0xFF
-		self.A = A
+		val = self.B
+		carry = (self.F & FLAG_C) >> 4
+		result = A + val + carry
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) + carry > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0x89 -
 	# Z 0 H C
 	def ADC_A_C(self):
 
 		A = self.A
-		C = self.C
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + ((C+self.flags["C"]) & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + ((C+self.flags["C"]) & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + C + self.flags["C"]) & 0xFF
-		self.A = A
+		val = self.C
+		carry = (self.F & FLAG_C) >> 4
+		result = A + val + carry
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) + carry > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0x8A -
 	# Z 0 H C
 	def ADC_A_D(self):
 
 		A = self.A
-		D = self.D
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + ((D+self.flags["C"]) & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + ((D+self.flags["C"]) & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + D + self.flags["C"]) & 0xFF
-		self.A = A
+		val = self.D
+		carry = (self.F & FLAG_C) >> 4
+		result = A + val + carry
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) + carry > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0x8B -
 	# Z 0 H C
 	def ADC_A_E(self):
 
 		A = self.A
-		E = self.E
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + ((E+self.flags["C"]) & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + ((E+self.flags["C"]) & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + E + self.flags["C"]) & 0xFF
-		self.A = A
+		val = self.E
+		carry = (self.F & FLAG_C) >> 4
+		result = A + val + carry
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) + carry > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0x8C -
 	# Z 0 H C
 	def ADC_A_H(self):
 
 		A = self.A
-		H = self.H
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + ((H+self.flags["C"]) & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + ((H+self.flags["C"]) & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + H + self.flags["C"]) & 0xFF
-		self.A = A
+		val = self.H
+		carry = (self.F & FLAG_C) >> 4
+		result = A + val + carry
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) + carry > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0x8D -
 	# Z 0 H C
 	def ADC_A_L(self):
 
 		A = self.A
-		L = self.L
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + ((L+self.flags["C"]) & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + ((L+self.flags["C"]) & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + L + self.flags["C"]) & 0xFF
-		self.A = A
+		val = self.L
+		carry = (self.F & FLAG_C) >> 4
+		result = A + val + carry
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) + carry > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0x8E -
 	# Z 0 H C
 	def ADC_A_M_HL(self):
 
 		A = self.A
-		HL = self.memory.read(self.get_HL())
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + ((HL+self.flags["C"]) & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + ((HL+self.flags["C"]) & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + HL + self.flags["C"]) & 0xFF
-		self.A = A
+		val = self.read(self.get_HL())
+		carry = (self.F & FLAG_C) >> 4
+		result = A + val + carry
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) + carry > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0x8F -
 	# Z 0 H C
 	def ADC_A_A(self):
 
 		A = self.A
-		A2 = self.A
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + ((A2+self.flags["C"]) & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + ((A2+self.flags["C"]) & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + A2 + self.flags["C"]) & 0xFF
-		self.A = A
+		val = self.A
+		carry = (self.F & FLAG_C) >> 4
+		result = A + val + carry
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) + carry > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0x90 -
 	# Z 1 H C
 	def SUB_B(self):
 
-		result = self.A - self.B
-
-		# C - Set if no borrow
-		if self.A > self.B:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (self.B & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.B
+		result = A - val
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if result < 0 else 0)
 
 
 	# 0x91 -
 	# Z 1 H C
 	def SUB_C(self):
 
-		result = self.A - self.C
-
-		# C - Set if no borrow
-		if self.A > self.C:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (self.C & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.C
+		result = A - val
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if result < 0 else 0)
 
 	# 0x92 -
 	# Z 1 H C
 	def SUB_D(self):
 
-		result = self.A - self.D
-
-		# C - Set if no borrow
-		if self.A > self.D:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (self.D & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.D
+		result = A - val
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if result < 0 else 0)
 
 	# 0x93 -
 	# Z 1 H C
 	def SUB_E(self):
 
-		result = self.A - self.E
-
-		# C - Set if no borrow
-		if self.A > self.E:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (self.E & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.E
+		result = A - val
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if result < 0 else 0)
 
 	# 0x94 -
 	# Z 1 H C
 	def SUB_H(self):
 
-		result = self.A - self.H
-
-		# C - Set if no borrow
-		if self.A > self.H:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (self.H & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.H
+		result = A - val
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if result < 0 else 0)
 
 	# 0x95 -
 	# Z 1 H C
 	def SUB_L(self):
 
-		result = self.A - self.L
-
-		# C - Set if no borrow
-		if self.A > self.L:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (self.L & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.L
+		result = A - val
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if result < 0 else 0)
 
 	# 0x96 -
 	# Z 1 H C
 	def SUB_M_HL(self):
 
-		val = self.memory.read(self.get_HL())
-		result = self.A - val
-
-		# C - Set if no borrow
-		if self.A > val:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (val & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.read(self.get_HL())
+		result = A - val
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if result < 0 else 0)
 
 	# 0x97 -
 	# Z 1 H C
 	def SUB_A(self):
 
-		result = self.A - self.A
-
-		# C - Set if no borrow
-		if self.A > self.A:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (self.A & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.A
+		result = A - val
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if result < 0 else 0)
 
 	# 0x98 -
 	# Z 1 H C
 	def SBC_A_B(self):
 
-		result = self.A - self.B - self.flags["C"]
-
-		# C - Set if no borrow
-		if self.A > (self.B + self.flags["C"]):
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > ((self.B + self.flags["C"]) & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.B
+		carry = (self.F & FLAG_C) >> 4
+		result = A - val - carry
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) - (val & 0x0F) - carry < 0 else 0) | (FLAG_C if result < 0 else 0)
 
 
 	# 0x99 -
 	# Z 1 H C
 	def SBC_A_C(self):
 
-		result = self.A - self.C - self.flags["C"]
-
-		# C - Set if no borrow
-		if self.A > (self.C + self.flags["C"]):
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > ((self.C + self.flags["C"]) & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.C
+		carry = (self.F & FLAG_C) >> 4
+		result = A - val - carry
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) - (val & 0x0F) - carry < 0 else 0) | (FLAG_C if result < 0 else 0)
 
 	# 0x9A -
 	# Z 1 H C
 	def SBC_A_D(self):
 
-		result = self.A - self.D - self.flags["C"]
-
-		# C - Set if no borrow
-		if self.A > (self.D + self.flags["C"]):
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > ((self.D + self.flags["C"]) & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.D
+		carry = (self.F & FLAG_C) >> 4
+		result = A - val - carry
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) - (val & 0x0F) - carry < 0 else 0) | (FLAG_C if result < 0 else 0)
 
 	# 0x9B -
 	# Z 1 H C
 	def SBC_A_E(self):
 
-		result = self.A - self.E - self.flags["C"]
-
-		# C - Set if no borrow
-		if self.A > (self.E + self.flags["C"]):
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > ((self.E + self.flags["C"]) & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.E
+		carry = (self.F & FLAG_C) >> 4
+		result = A - val - carry
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) - (val & 0x0F) - carry < 0 else 0) | (FLAG_C if result < 0 else 0)
 
 	# 0x9C -
 	# Z 1 H C
 	def SBC_A_H(self):
 
-		result = self.A - self.H - self.flags["C"]
-
-		# C - Set if no borrow
-		if self.A > (self.H + self.flags["C"]):
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > ((self.H + self.flags["C"]) & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.H
+		carry = (self.F & FLAG_C) >> 4
+		result = A - val - carry
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) - (val & 0x0F) - carry < 0 else 0) | (FLAG_C if result < 0 else 0)
 
 	# 0x9D -
 	# Z 1 H C
 	def SBC_A_L(self):
 
-		result = self.A - self.L - self.flags["C"]
-
-		# C - Set if no borrow
-		if self.A > (self.L + self.flags["C"]):
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > ((self.L + self.flags["C"]) & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.L
+		carry = (self.F & FLAG_C) >> 4
+		result = A - val - carry
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) - (val & 0x0F) - carry < 0 else 0) | (FLAG_C if result < 0 else 0)
 
 	# 0x9E -
 	# Z 1 H C
 	def SBC_A_M_HL(self):
 
-		val = self.memory.read(self.get_HL())
-		result = self.A - val - self.flags["C"]
-
-		# C - Set if no borrow
-		if self.A > (val + self.flags["C"]):
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > ((val + self.flags["C"]) & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.read(self.get_HL())
+		carry = (self.F & FLAG_C) >> 4
+		result = A - val - carry
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) - (val & 0x0F) - carry < 0 else 0) | (FLAG_C if result < 0 else 0)
 
 	# 0x9F -
 	# Z 1 H C
 	def SBC_A_A(self):
 
-		result = self.A - self.A - self.flags["C"]
-
-		# C - Set if no borrow
-		if self.A > (self.A + self.flags["C"]):
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > ((self.A + self.flags["C"]) & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.A
+		carry = (self.F & FLAG_C) >> 4
+		result = A - val - carry
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) - (val & 0x0F) - carry < 0 else 0) | (FLAG_C if result < 0 else 0)
 
 	# 0xA0 -
 	# Z 0 1 0
 	def AND_B(self):
 
-		self.A = self.A & self.B
+		self.A &= self.B
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Set
-		self.flags["H"] = 1
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_H
 
 	# 0xA1 -
 	# Z 0 1 0
 	def AND_C(self):
 
-		self.A = self.A & self.C
+		self.A &= self.C
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Set
-		self.flags["H"] = 1
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_H
 
 	# 0xA2 -
 	# Z 0 1 0
 	def AND_D(self):
 
-		self.A = self.A & self.D
+		self.A &= self.D
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Set
-		self.flags["H"] = 1
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_H
 
 	# 0xA3 -
 	# Z 0 1 0
 	def AND_E(self):
 
-		self.A = self.A & self.E
+		self.A &= self.E
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Set
-		self.flags["H"] = 1
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_H
 
 	# 0xA4 -
 	# Z 0 1 0
 	def AND_H(self):
 
-		self.A = self.A & self.H
+		self.A &= self.H
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Set
-		self.flags["H"] = 1
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_H
 
 	# 0xA5 -
 	# Z 0 1 0
 	def AND_L(self):
 
-		self.A = self.A & self.L
+		self.A &= self.L
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Set
-		self.flags["H"] = 1
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_H
 
 	# 0xA6 -
 	# Z 0 1 0
 	def AND_M_HL(self):
 
-		val = self.memory.read(self.get_HL())
-		self.A = self.A & val
+		self.A &= self.read(self.get_HL())
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Set
-		self.flags["H"] = 1
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_H
 
 	# 0xA7 -
 	# Z 0 1 0
 	def AND_A(self):
 
-		self.A = self.A & self.A
+		self.A &= self.A
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Set
-		self.flags["H"] = 1
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_H
 
 	# 0xA8 -
 	# Z 0 0 0
@@ -2725,19 +2143,10 @@ class CPU:
 		self.A = (self.A ^ self.B) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xA9 -
 	# Z 0 0 0
@@ -2746,19 +2155,10 @@ class CPU:
 		self.A = (self.A ^ self.C) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xAA -
 	# Z 0 0 0
@@ -2767,19 +2167,10 @@ class CPU:
 		self.A = (self.A ^ self.D) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xAB -
 	# Z 0 0 0
@@ -2788,19 +2179,10 @@ class CPU:
 		self.A = (self.A ^ self.E) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xAC -
 	# Z 0 0 0
@@ -2809,19 +2191,10 @@ class CPU:
 		self.A = (self.A ^ self.H) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xAD -
 	# Z 0 0 0
@@ -2830,41 +2203,22 @@ class CPU:
 		self.A = (self.A ^ self.L) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xAE -
 	# Z 0 0 0
 	def XOR_M_HL(self):
 
-		val = self.memory.read(self.get_HL())
-		self.A = (self.A ^ val) & 0xFF
+		self.A = (self.A ^ self.read(self.get_HL())) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xAF -
 	# Z 0 0 0
@@ -2873,19 +2227,10 @@ class CPU:
 		self.A = (self.A ^ self.A) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xB0 -
 	# Z 0 0 0
@@ -2894,19 +2239,10 @@ class CPU:
 		self.A = (self.A | self.B) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xB1 -
 	# Z 0 0 0
@@ -2915,19 +2251,10 @@ class CPU:
 		self.A = (self.A | self.C) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xB2 -
 	# Z 0 0 0
@@ -2936,19 +2263,10 @@ class CPU:
 		self.A = (self.A | self.D) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xB3 -
 	# Z 0 0 0
@@ -2957,19 +2275,10 @@ class CPU:
 		self.A = (self.A | self.E) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xB4 -
 	# Z 0 0 0
@@ -2978,19 +2287,10 @@ class CPU:
 		self.A = (self.A | self.H) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xB5 -
 	# Z 0 0 0
@@ -2999,41 +2299,22 @@ class CPU:
 		self.A = (self.A | self.L) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xB6 -
 	# Z 0 0 0
 	def OR_M_HL(self):
 
-		val = self.memory.read(self.get_HL())
-		self.A = (self.A | val) & 0xFF
+		self.A = (self.A | self.read(self.get_HL())) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xB7 -
 	# Z 0 0 0
@@ -3042,242 +2323,120 @@ class CPU:
 		self.A = (self.A | self.A) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xB8 -
 	# Z 1 H C
 	def CP_B(self):
 
-		result = self.A - self.B
-
-		# C - Set for no borrow (A < n)
-		if self.A < self.B:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (self.B & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
+		A = self.A
+		val = self.B
 
 		# Z - Set if result is zero (A == n)
-		if self.A == self.B:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow (A < n)
+		self.F = (FLAG_Z if A == val else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if A < val else 0)
 
 	# 0xB9 -
 	# Z 1 H C
 	def CP_C(self):
 
-		result = self.A - self.C
-
-		# C - Set for no borrow (A < n)
-		if self.A < self.C:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (self.C & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
+		A = self.A
+		val = self.C
 
 		# Z - Set if result is zero (A == n)
-		if self.A == self.C:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow (A < n)
+		self.F = (FLAG_Z if A == val else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if A < val else 0)
 
 	# 0xBA -
 	# Z 1 H C
 	def CP_D(self):
 
-		result = self.A - self.D
-
-		# C - Set for no borrow (A < n)
-		if self.A < self.D:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (self.D & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
+		A = self.A
+		val = self.D
 
 		# Z - Set if result is zero (A == n)
-		if self.A == self.D:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow (A < n)
+		self.F = (FLAG_Z if A == val else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if A < val else 0)
 
 	# 0xBB -
 	# Z 1 H C
 	def CP_E(self):
 
-		result = self.A - self.E
-
-		# C - Set for no borrow (A < n)
-		if self.A < self.E:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (self.E & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
+		A = self.A
+		val = self.E
 
 		# Z - Set if result is zero (A == n)
-		if self.A == self.E:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow (A < n)
+		self.F = (FLAG_Z if A == val else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if A < val else 0)
 
 	# 0xBC -
 	# Z 1 H C
 	def CP_H(self):
 
-		result = self.A - self.H
-
-		# C - Set for no borrow (A < n)
-		if self.A < self.H:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (self.H & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
+		A = self.A
+		val = self.H
 
 		# Z - Set if result is zero (A == n)
-		if self.A == self.H:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow (A < n)
+		self.F = (FLAG_Z if A == val else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if A < val else 0)
 
 	# 0xBD -
 	# Z 1 H C
 	def CP_L(self):
 
-		result = self.A - self.L
-
-		# C - Set for no borrow (A < n)
-		if self.A < self.L:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (self.L & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
+		A = self.A
+		val = self.L
 
 		# Z - Set if result is zero (A == n)
-		if self.A == self.L:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow (A < n)
+		self.F = (FLAG_Z if A == val else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if A < val else 0)
 
 	# 0xBE -
 	# Z 1 H C
 	def CP_M_HL(self):
 
-		val = self.memory.read(self.get_HL())
-		result = self.A - val
-
-		# C - Set for no borrow (A < n)
-		if self.A < val:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (val & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
+		A = self.A
+		val = self.read(self.get_HL())
 
 		# Z - Set if result is zero (A == n)
-		if self.A == val:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow (A < n)
+		self.F = (FLAG_Z if A == val else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if A < val else 0)
 
 	# 0xBF -
 	# Z 1 H C
 	def CP_A(self):
 
-		result = self.A - self.A
-
-		# C - Set for no borrow (A < n)
-		if self.A < self.A:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (self.A & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
+		A = self.A
+		val = self.A
 
 		# Z - Set if result is zero (A == n)
-		if self.A == self.A:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow (A < n)
+		self.F = (FLAG_Z if A == val else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if A < val else 0)
 
 	# 0xC0 - Return if not zero
 	# - - - -
 	def RET_NZ(self):
 
-		if self.flags["Z"] == 0:
+		if not self.F & FLAG_Z:
 			address_low = self.POP()
 			address_high = self.POP()
 			self.PC = (address_high << 8) | address_low
@@ -3293,7 +2452,7 @@ class CPU:
 	# - - - -
 	def JP_NZ_a16(self):
 
-		if self.flags["Z"] == 0:
+		if not self.F & FLAG_Z:
 			self.PC = (self.args[1] << 8) | self.args[0]
 
 	# 0xC3 -
@@ -3306,7 +2465,7 @@ class CPU:
 	# - - - -
 	def CALL_NZ_a16(self):
 
-		if self.flags["Z"] == 0:
+		if not self.F & FLAG_Z:
 			self.PUSH((self.PC & 0xFF00) >> 8)
 			self.PUSH(self.PC & 0x00FF)
 			self.PC = (self.args[1] << 8) | self.args[0]
@@ -3323,25 +2482,15 @@ class CPU:
 	def ADD_A_d8(self):
 
 		A = self.A
-		d8 = self.args[0]
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + (d8 & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + (d8 & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-
-		A = (A + d8) & 0xFF
-		self.A = A
+		val = self.args[0]
+		result = A + val
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0xC7 -
 	# - - - -
@@ -3355,7 +2504,7 @@ class CPU:
 	# - - - -
 	def RET_Z(self):
 
-		if self.flags["Z"] == 1:
+		if self.F & FLAG_Z:
 			address_low = self.POP()
 			address_high = self.POP()
 			self.PC = (address_high << 8) | address_low
@@ -3372,8 +2521,8 @@ class CPU:
 	# - - - -
 	def JP_Z_a16(self):
 
-		if self.flags["Z"] == 1:
-			self.PC = (args[1] << 8) | self.args[0]
+		if self.F & FLAG_Z:
+			self.PC = (self.args[1] << 8) | self.args[0]
 
 	# 0xCB -
 	# - - - -
@@ -3385,7 +2534,7 @@ class CPU:
 	# - - - -
 	def CALL_Z_a16(self):
 
-		if self.flags["Z"] == 1:
+		if self.F & FLAG_Z:
 			self.PUSH((self.PC & 0xFF00) >> 8)
 			self.PUSH(self.PC & 0x00FF)
 			self.PC = (self.args[1] << 8) | self.args[0]
@@ -3403,31 +2552,16 @@ class CPU:
 	def ADC_A_d8(self):
 
 		A = self.A
-		d8 = self.args[0]
-
-		# H - Set if carry from bit 3
-		if (((A & 0xFF) + ((d8+self.flags["C"]) & 0xFF)) & 0x10) == 0x10:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# C - Set if carry from bit 7
-		if (((A & 0xFF) + ((d8+self.flags["C"]) & 0xFF)) & 0x80) == 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		A = (A + d8 + self.flags["C"]) & 0xFF
-		self.A = A
+		val = self.args[0]
+		carry = (self.F & FLAG_C) >> 4
+		result = A + val + carry
+		self.A = result & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_Z if self.A == 0 else 0) | (FLAG_H if (A & 0x0F) + (val & 0x0F) + carry > 0x0F else 0) | (FLAG_C if result > 0xFF else 0)
 
 	# 0xCF -
 	# - - - -
@@ -3441,7 +2575,7 @@ class CPU:
 	# - - - -
 	def RET_NC(self):
 
-		if self.flags["C"] == 0:
+		if not self.F & FLAG_C:
 			address_low = self.POP()
 			address_high = self.POP()
 			self.PC = (address_high << 8) | address_low
@@ -3457,8 +2591,8 @@ class CPU:
 	# - - - -
 	def JP_NC_a16(self):
 
-		if self.flags["C"] == 0:
-			self.PC = (args[1] << 8) | self.args[0]
+		if not self.F & FLAG_C:
+			self.PC = (self.args[1] << 8) | self.args[0]
 
 	# 0xD3 -
 	# - - - -
@@ -3468,7 +2602,7 @@ class CPU:
 	# - - - -
 	def CALL_NC_a16(self):
 
-		if self.flags["C"] == 0:
+		if not self.F & FLAG_C:
 			self.PUSH((self.PC & 0xFF00) >> 8)
 			self.PUSH(self.PC & 0x00FF)
 			self.PC = (self.args[1] << 8) | self.args[0]
@@ -3484,31 +2618,16 @@ class CPU:
 	# Z 1 H C
 	def SUB_d8(self):
 
-		d8 = self.args[0]
-		result = self.A - d8
-
-		# C - Set if no borrow
-		if self.A > d8:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (d8 & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.args[0]
+		result = A - val
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if result < 0 else 0)
 
 	# 0xD7 -
 	# - - - -
@@ -3522,7 +2641,7 @@ class CPU:
 	# - - - -
 	def RET_C(self):
 
-		if self.flags["C"] == 1:
+		if self.F & FLAG_C:
 			address_low = self.POP()
 			address_high = self.POP()
 			self.PC = (address_high << 8) | address_low
@@ -3534,13 +2653,13 @@ class CPU:
 		address_low = self.POP()
 		address_high = self.POP()
 		self.PC = (address_high << 8) | address_low
-		self.INT_ENABLE = True
+		self.memory.enable_interrupts(False)
 
 	# 0xDA -
 	# - - - -
 	def JP_C_a16(self):
 
-		if self.flags["C"] == 1:
+		if self.F & FLAG_C:
 			self.PC = (self.args[1] << 8) | self.args[0]
 
 	# 0xDB -
@@ -3551,7 +2670,7 @@ class CPU:
 	# - - - -
 	def CALL_C_a16(self):
 
-		if self.flags["C"] == 1:
+		if self.F & FLAG_C:
 			self.PUSH((self.PC & 0xFF00) >> 8)
 			self.PUSH(self.PC & 0x00FF)
 			self.PC = (self.args[1] << 8) | self.args[0]
@@ -3564,31 +2683,17 @@ class CPU:
 	# Z 1 H C
 	def SBC_A_d8(self):
 
-		d8 = self.args[0]
-		result = self.A - d8 - self.flags["C"]
-
-		# C - Set if no borrow
-		if self.A > (d8 + self.flags["C"]):
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > ((d8 + self.flags["C"]) & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
-
+		A = self.A
+		val = self.args[0]
+		carry = (self.F & FLAG_C) >> 4
+		result = A - val - carry
 		self.A = result & 0xFF
 
-		# Z - Set if result is zero
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# Z - Set if result is 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_N | (FLAG_H if (A & 0x0F) - (val & 0x0F) - carry < 0 else 0) | (FLAG_C if result < 0 else 0)
 
 	# 0xDF -
 	# - - - -
@@ -3602,7 +2707,7 @@ class CPU:
 	# - - - -
 	def LDH_M_a8_A(self):
 
-		self.memory.write(0xFF00 + self.args[0], self.A)
+		self.write(0xFF00 + self.args[0], self.A)
 
 	# 0xE1 -
 	# - - - -
@@ -3615,7 +2720,7 @@ class CPU:
 	# - - - -
 	def LD_M_C_A(self):
 
-		self.memory.write(0xFF00 + self.C, self.A)
+		self.write(0xFF00 + self.C, self.A)
 
 	# 0xE3 -
 	# - - - -
@@ -3636,23 +2741,13 @@ class CPU:
 	# Z 0 1 0
 	def AND_d8(self):
 
-		d8 = self.args[0]
-		self.A = self.A & d8
+		self.A &= self.args[0]
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Set
-		self.flags["H"] = 1
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = (FLAG_Z if self.A == 0 else 0) | FLAG_H
 
 	# 0xE7 -
 	# - - - -
@@ -3666,25 +2761,18 @@ class CPU:
 	# 0 0 H C
 	def ADD_SP_r8(self):
 
-		# H - Set if carry from bit 11
-		if (((self.SP & 0xFFFF) + (self.args[0] & 0xFFFF)) & 0x1000) == 0x1000:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# H - Set if carry from bit 15
-		if (((self.SP & 0xFFFF) + (self.args[0] & 0xFFFF)) & 0x8000) == 0x8000:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
+		r8 = self.args[0]
+		if r8 & 0x80:
+			r8 -= 0x100
 
-		self.SP = (self.SP + self.args[0]) & 0xFFFF
+		SP = self.SP
+		self.SP = (SP + r8) & 0xFFFF
 
 		# Z - Reset
-		self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_H if (SP & 0x0F) + (r8 & 0x0F) > 0x0F else 0) | (FLAG_C if (SP & 0xFF) + (r8 & 0xFF) > 0xFF else 0)
 
 	# 0xE9 -
 	# - - - -
@@ -3696,7 +2784,7 @@ class CPU:
 	# - - - -
 	def LD_M_a16_A(self):
 
-		self.memory.write((self.args[1] << 8) | self.args[0], self.A)
+		self.write((self.args[1] << 8) | self.args[0], self.A)
 
 	# 0xEB -
 	# - - - -
@@ -3714,23 +2802,13 @@ class CPU:
 	# Z 0 0 0
 	def XOR_d8(self):
 
-		d8 = self.args[0]
-		self.A = self.A ^ d8
+		self.A = (self.A ^ self.args[0]) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xEF -
 	# - - - -
@@ -3744,26 +2822,27 @@ class CPU:
 	# - - - -
 	def LDH_A_M_a8(self):
 
-		self.A = self.memory.read(0xFF00 + self.args[0])
+		self.A = self.read(0xFF00 + self.args[0])
 
 	# 0xF1 -
 	# - - - -
 	def POP_AF(self):
 
-		self.F = self.POP()
+		# The lower nibble of F is always zero
+		self.F = self.POP() & 0xF0
 		self.A = self.POP()
 
 	# 0xF2 -
 	# - - - -
 	def LD_A_M_C(self):
 
-		self.A = self.memory.read(0xFF00 + self.C)
+		self.A = self.read(0xFF00 + self.C)
 
 	# 0xF3 -
 	# - - - -
 	def DI(self):
 
-		self.INT_ENABLE = False
+		self.memory.disable_interrupts()
 
 	# 0xF4 -
 	# - - - -
@@ -3780,23 +2859,13 @@ class CPU:
 	# Z 0 0 0
 	def OR_d8(self):
 
-		d8 = self.args[0]
-		self.A = self.A | d8
+		self.A = (self.A | self.args[0]) & 0xFF
 
 		# Z - Set if result is 0
-		if self.A == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
+		self.F = FLAG_Z if self.A == 0 else 0
 
 	# 0xF7 -
 	#  - - - -
@@ -3810,33 +2879,20 @@ class CPU:
 	# 0 0 H C
 	def LD_HL_SP_r8(self):
 
-		if self.args[0] & 0x80:
-			r8 = -0x100 + self.args[0]
-		else:
-			r8 = self.args[0]
-
-		result = self.SP + r8
-
-		# H - Set if carry from bit 11
-		if (((self.SP & 0xFFFF) + (r8 & 0xFFFF)) & 0x1000) == 0x1000:
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
+		r8 = self.args[0]
+		if r8 & 0x80:
+			r8 -= 0x100
 
-		# C - Set if carry from bit 15
-		if (((self.SP & 0xFFFF) + (r8 & 0xFFFF)) & 0x8000) == 0x8000:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
+		SP = self.SP
+		result = (SP + r8) & 0xFFFF
+		self.L = result & 0x00FF
+		self.H = (result & 0xFF00) >> 8
 
 		# Z - Reset
-		self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
-		self.L = result & 0x00FF
-		self.H = (result & 0xFF00) >> 8
+		# H - Set if carry from bit 3
+		# C - Set if carry from bit 7
+		self.F = (FLAG_H if (SP & 0x0F) + (r8 & 0x0F) > 0x0F else 0) | (FLAG_C if (SP & 0xFF) + (r8 & 0xFF) > 0xFF else 0)
 
 	# 0xF9 -
 	# - - - -
@@ -3848,13 +2904,13 @@ class CPU:
 	# - - - -
 	def LD_A_M_a16(self):
 
-		self.A = self.memory.read((self.args[1] << 8) | self.args[0])
+		self.A = self.read((self.args[1] << 8) | self.args[0])
 
 	# 0xFB -
 	# - - - -
 	def EI(self):
 
-		self.INT_ENABLE = True
+		self.memory.enable_interrupts(True)
 
 	# 0xFC -
 	# - - - -
@@ -3868,29 +2924,14 @@ class CPU:
 	# Z 1 H C
 	def CP_d8(self):
 
-		d8 = self.args[0]
-		result = self.A - d8
-
-		# C - Set for no borrow (A < n)
-		if self.A < d8:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
-
-		# H - Set if no borrow from bit 4
-		if ((self.A & 0xF) > (d8 & 0xF)):
-			self.flags["H"] = 1
-		else:
-			self.flags["H"] = 0
-
-		# N - Set
-		self.flags["N"] = 1
+		A = self.A
+		val = self.args[0]
 
 		# Z - Set if result is zero (A == n)
-		if self.A == d8:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		# N - Set
+		# H - Set if borrow from bit 4
+		# C - Set if borrow (A < n)
+		self.F = (FLAG_Z if A == val else 0) | FLAG_N | (FLAG_H if (A & 0x0F) < (val & 0x0F) else 0) | (FLAG_C if A < val else 0)
 
 	# 0xFF -
 	# 	- - - -
@@ -3904,960 +2945,259 @@ class CPU:
 
 	def CB_execute(self):
 
-		op = self.opcode
-
-		if op == 0x00:
-			self.RLC("B")
-		elif op == 0x01:
-			self.RLC("C")
-		elif op == 0x02:
-			self.RLC("D")
-		elif op == 0x03:
-			self.RLC("E")
-		elif op == 0x04:
-			self.RLC("H")
-		elif op == 0x05:
-			self.RLC("L")
-		elif op == 0x06:
-			self.RLC("M_HL")
-		elif op == 0x07:
-			self.RLC("A")
-		elif op == 0x08:
-			self.RRC("B")
-		elif op == 0x09:
-			self.RRC("C")
-		elif op == 0x0A:
-			self.RRC("D")
-		elif op == 0x0B:
-			self.RRC("E")
-		elif op == 0x0C:
-			self.RRC("H")
-		elif op == 0x0D:
-			self.RRC("L")
-		elif op == 0x0E:
-			self.RRC("M_HL")
-		elif op == 0x0F:
-			self.RRC("A")
-		elif op == 0x10:
-			self.RL("B")
-		elif op == 0x11:
-			self.RL("C")
-		elif op == 0x12:
-			self.RL("D")
-		elif op == 0x13:
-			self.RL("E")
-		elif op == 0x14:
-			self.RL("H")
-		elif op == 0x15:
-			self.RL("L")
-		elif op == 0x16:
-			self.RL("M_HL")
-		elif op == 0x17:
-			self.RL("A")
-		elif op == 0x18:
-			self.RR("B")
-		elif op == 0x19:
-			self.RR("C")
-		elif op == 0x1A:
-			self.RR("D")
-		elif op == 0x1B:
-			self.RR("E")
-		elif op == 0x1C:
-			self.RR("H")
-		elif op == 0x1D:
-			self.RR("L")
-		elif op == 0x1E:
-			self.RR("M_HL")
-		elif op == 0x1F:
-			self.RR("A")
-		elif op == 0x20:
-			self.SLA("B")
-		elif op == 0x21:
-			self.SLA("C")
-		elif op == 0x22:
-			self.SLA("D")
-		elif op == 0x23:
-			self.SLA("E")
-		elif op == 0x24:
-			self.SLA("H")
-		elif op == 0x25:
-			self.SLA("L")
-		elif op == 0x26:
-			self.SLA("M_HL")
-		elif op == 0x27:
-			self.SLA("A")
-		elif op == 0x28:
-			self.SRA("B")
-		elif op == 0x29:
-			self.SRA("C")
-		elif op == 0x2A:
-			self.SRA("D")
-		elif op == 0x2B:
-			self.SRA("E")
-		elif op == 0x2C:
-			self.SRA("H")
-		elif op == 0x2D:
-			self.SRA("L")
-		elif op == 0x2E:
-			self.SRA("M_HL")
-		elif op == 0x2F:
-			self.SRA("A")
-		elif op == 0x30:
-			self.SWAP("B")
-		elif op == 0x31:
-			self.SWAP("C")
-		elif op == 0x32:
-			self.SWAP("D")
-		elif op == 0x33:
-			self.SWAP("E")
-		elif op == 0x34:
-			self.SWAP("H")
-		elif op == 0x35:
-			self.SWAP("L")
-		elif op == 0x36:
-			self.SWAP("M_HL")
-		elif op == 0x37:
-			self.SWAP("A")
-		elif op == 0x38:
-			self.SRL("B")
-		elif op == 0x39:
-			self.SRL("C")
-		elif op == 0x3A:
-			self.SRL("D")
-		elif op == 0x3B:
-			self.SRL("E")
-		elif op == 0x3C:
-			self.SRL("H")
-		elif op == 0x3D:
-			self.SRL("L")
-		elif op == 0x3E:
-			self.SRL("M_HL")
-		elif op == 0x3F:
-			self.SRL("A")
-		elif op == 0x40:
-			self.BIT(0, "B")
-		elif op == 0x41:
-			self.BIT(0, "C")
-		elif op == 0x42:
-			self.BIT(0, "D")
-		elif op == 0x43:
-			self.BIT(0, "E")
-		elif op == 0x44:
-			self.BIT(0, "H")
-		elif op == 0x45:
-			self.BIT(0, "L")
-		elif op == 0x46:
-			self.BIT(0, "M_HL")
-		elif op == 0x47:
-			self.BIT(0, "A")
-		elif op == 0x48:
-			self.BIT(1, "B")
-		elif op == 0x49:
-			self.BIT(1, "C")
-		elif op == 0x4A:
-			self.BIT(1, "D")
-		elif op == 0x4B:
-			self.BIT(1, "E")
-		elif op == 0x4C:
-			self.BIT(1, "H")
-		elif op == 0x4D:
-			self.BIT(1, "L")
-		elif op == 0x4E:
-			self.BIT(1, "M_HL")
-		elif op == 0x4F:
-			self.BIT(1, "A")
-		elif op == 0x50:
-			self.BIT(2, "B")
-		elif op == 0x51:
-			self.BIT(2, "C")
-		elif op == 0x52:
-			self.BIT(2, "D")
-		elif op == 0x53:
-			self.BIT(2, "E")
-		elif op == 0x54:
-			self.BIT(2, "H")
-		elif op == 0x55:
-			self.BIT(2, "L")
-		elif op == 0x56:
-			self.BIT(2, "M_HL")
-		elif op == 0x57:
-			self.BIT(2, "A")
-		elif op == 0x58:
-			self.BIT(3, "B")
-		elif op == 0x59:
-			self.BIT(3, "C")
-		elif op == 0x5A:
-			self.BIT(3, "D")
-		elif op == 0x5B:
-			self.BIT(3, "E")
-		elif op == 0x5C:
-			self.BIT(3, "H")
-		elif op == 0x5D:
-			self.BIT(3, "L")
-		elif op == 0x5E:
-			self.BIT(3, "M_HL")
-		elif op == 0x5F:
-			self.BIT(3, "A")
-		elif op == 0x60:
-			self.BIT(4, "B")
-		elif op == 0x61:
-			self.BIT(4, "C")
-		elif op == 0x62:
-			self.BIT(4, "D")
-		elif op == 0x63:
-			self.BIT(4, "E")
-		elif op == 0x64:
-			self.BIT(4, "H")
-		elif op == 0x65:
-			self.BIT(4, "L")
-		elif op == 0x66:
-			self.BIT(4, "M_HL")
-		elif op == 0x67:
-			self.BIT(4, "A")
-		elif op == 0x68:
-			self.BIT(5, "B")
-		elif op == 0x69:
-			self.BIT(5, "C")
-		elif op == 0x6A:
-			self.BIT(5, "D")
-		elif op == 0x6B:
-			self.BIT(5, "E")
-		elif op == 0x6C:
-			self.BIT(5, "H")
-		elif op == 0x6D:
-			self.BIT(5, "L")
-		elif op == 0x6E:
-			self.BIT(5, "M_HL")
-		elif op == 0x6F:
-			self.BIT(5, "A")
-		elif op == 0x70:
-			self.BIT(6, "B")
-		elif op == 0x71:
-			self.BIT(6, "C")
-		elif op == 0x72:
-			self.BIT(6, "D")
-		elif op == 0x73:
-			self.BIT(6, "E")
-		elif op == 0x74:
-			self.BIT6("H")
-		elif op == 0x75:
-			self.BIT(6, "L")
-		elif op == 0x76:
-			self.BIT(6, "M_HL")
-		elif op == 0x77:
-			self.BIT(6, "A")
-		elif op == 0x78:
-			self.BIT(7, "B")
-		elif op == 0x79:
-			self.BIT(7, "C")
-		elif op == 0x7A:
-			self.BIT(7, "D")
-		elif op == 0x7B:
-			self.BIT(7, "E")
-		elif op == 0x7C:
-			self.BIT(7, "H")
-		elif op == 0x7D:
-			self.BIT(7, "L")
-		elif op == 0x7E:
-			self.BIT(7, "M_HL")
-		elif op == 0x7F:
-			self.BIT(7, "A")
-		elif op == 0x80:
-			self.RES(0, "B")
-		elif op == 0x81:
-			self.RES(0, "C")
-		elif op == 0x82:
-			self.RES(0, "D")
-		elif op == 0x83:
-			self.RES(0, "E")
-		elif op == 0x84:
-			self.RES(0, "H")
-		elif op == 0x85:
-			self.RES(0, "L")
-		elif op == 0x86:
-			self.RES(0, "M_HL")
-		elif op == 0x87:
-			self.RES(0, "A")
-		elif op == 0x88:
-			self.RES(1, "B")
-		elif op == 0x89:
-			self.RES(1, "C")
-		elif op == 0x8A:
-			self.RES(1, "D")
-		elif op == 0x8B:
-			self.RES(1, "E")
-		elif op == 0x8C:
-			self.RES(1, "H")
-		elif op == 0x8D:
-			self.RES(1, "L")
-		elif op == 0x8E:
-			self.RES(1, "M_HL")
-		elif op == 0x8F:
-			self.RES(1, "A")
-		elif op == 0x90:
-			self.RES(2, "B")
-		elif op == 0x91:
-			self.RES(2, "C")
-		elif op == 0x92:
-			self.RES(2, "D")
-		elif op == 0x93:
-			self.RES(2, "E")
-		elif op == 0x94:
-			self.RES(2, "H")
-		elif op == 0x95:
-			self.RES(2, "L")
-		elif op == 0x96:
-			self.RES(2, "M_HL")
-		elif op == 0x97:
-			self.RES(2, "A")
-		elif op == 0x98:
-			self.RES(3, "B")
-		elif op == 0x99:
-			self.RES(3, "C")
-		elif op == 0x9A:
-			self.RES(3, "D")
-		elif op == 0x9B:
-			self.RES(3, "E")
-		elif op == 0x9C:
-			self.RES(3, "H")
-		elif op == 0x9D:
-			self.RES(3, "L")
-		elif op == 0x9E:
-			self.RES(3, "M_HL")
-		elif op == 0x9F:
-			self.RES(3, "A")
-		elif op == 0xA0:
-			self.RES(4, "B")
-		elif op == 0xA1:
-			self.RES(4, "C")
-		elif op == 0xA2:
-			self.RES(4, "D")
-		elif op == 0xA3:
-			self.RES(4, "E")
-		elif op == 0xA4:
-			self.RES(4, "H")
-		elif op == 0xA5:
-			self.RES(4, "L")
-		elif op == 0xA6:
-			self.RES(4, "M_HL")
-		elif op == 0xA7:
-			self.RES(4, "A")
-		elif op == 0xA8:
-			self.RES(5, "B")
-		elif op == 0xA9:
-			self.RES(5, "C")
-		elif op == 0xAA:
-			self.RES(5, "D")
-		elif op == 0xAB:
-			self.RES(5, "E")
-		elif op == 0xAC:
-			self.RES(5, "H")
-		elif op == 0xAD:
-			self.RES(5, "L")
-		elif op == 0xAE:
-			self.RES(5, "M_HL")
-		elif op == 0xAF:
-			self.RES(5, "A")
-		elif op == 0xB0:
-			self.RES(6, "B")
-		elif op == 0xB1:
-			self.RES(6, "C")
-		elif op == 0xB2:
-			self.RES(6, "D")
-		elif op == 0xB3:
-			self.RES(6, "E")
-		elif op == 0xB4:
-			self.RES(6, "H")
-		elif op == 0xB5:
-			self.RES(6, "L")
-		elif op == 0xB6:
-			self.RES(6, "M_HL")
-		elif op == 0xB7:
-			self.RES(6, "A")
-		elif op == 0xB8:
-			self.RES(7, "B")
-		elif op == 0xB9:
-			self.RES(7, "C")
-		elif op == 0xBA:
-			self.RES(7, "D")
-		elif op == 0xBB:
-			self.RES(7, "E")
-		elif op == 0xBC:
-			self.RES(7, "H")
-		elif op == 0xBD:
-			self.RES(7, "L")
-		elif op == 0xBE:
-			self.RES(7, "M_HL")
-		elif op == 0xBF:
-			self.RES(7, "A")
-		elif op == 0xC0:
-			self.SET(0, "B")
-		elif op == 0xC1:
-			self.SET(0, "C")
-		elif op == 0xC2:
-			self.SET(0, "D")
-		elif op == 0xC3:
-			self.SET(0, "E")
-		elif op == 0xC4:
-			self.SET(0, "H")
-		elif op == 0xC5:
-			self.SET(0, "L")
-		elif op == 0xC6:
-			self.SET(0, "M_HL")
-		elif op == 0xC7:
-			self.SET(0, "A")
-		elif op == 0xC8:
-			self.SET(1, "B")
-		elif op == 0xC9:
-			self.SET(1, "C")
-		elif op == 0xCA:
-			self.SET(1, "D")
-		elif op == 0xCB:
-			self.SET(1, "E")
-		elif op == 0xCC:
-			self.SET(1, "H")
-		elif op == 0xCD:
-			self.SET(1, "L")
-		elif op == 0xCE:
-			self.SET(1, "M_HL")
-		elif op == 0xCF:
-			self.SET(1, "A")
-		elif op == 0xD0:
-			self.SET(2, "B")
-		elif op == 0xD1:
-			self.SET(2, "C")
-		elif op == 0xD2:
-			self.SET(2, "D")
-		elif op == 0xD3:
-			self.SET(2, "E")
-		elif op == 0xD4:
-			self.SET(2, "H")
-		elif op == 0xD5:
-			self.SET(2, "L")
-		elif op == 0xD6:
-			self.SET(2, "M_HL")
-		elif op == 0xD7:
-			self.SET(2, "A")
-		elif op == 0xD8:
-			self.SET(3, "B")
-		elif op == 0xD9:
-			self.SET(3, "C")
-		elif op == 0xDA:
-			self.SET(3, "D")
-		elif op == 0xDB:
-			self.SET(3, "E")
-		elif op == 0xDC:
-			self.SET(3, "H")
-		elif op == 0xDD:
-			self.SET(3, "L")
-		elif op == 0xDE:
-			self.SET(3, "M_HL")
-		elif op == 0xDF:
-			self.SET(3, "A")
-		elif op == 0xE0:
-			self.SET(4, "B")
-		elif op == 0xE1:
-			self.SET(4, "C")
-		elif op == 0xE2:
-			self.SET(4, "D")
-		elif op == 0xE3:
-			self.SET(4, "E")
-		elif op == 0xE4:
-			self.SET(4, "H")
-		elif op == 0xE5:
-			self.SET(4, "L")
-		elif op == 0xE6:
-			self.SET(4, "M_HL")
-		elif op == 0xE7:
-			self.SET(4, "A")
-		elif op == 0xE8:
-			self.SET(5, "B")
-		elif op == 0xE9:
-			self.SET(5, "C")
-		elif op == 0xEA:
-			self.SET(5, "D")
-		elif op == 0xEB:
-			self.SET(5, "E")
-		elif op == 0xEC:
-			self.SET(5, "H")
-		elif op == 0xED:
-			self.SET(5, "L")
-		elif op == 0xEE:
-			self.SET(5, "M_HL")
-		elif op == 0xEF:
-			self.SET(5, "A")
-		elif op == 0xF0:
-			self.SET(6, "B")
-		elif op == 0xF1:
-			self.SET(6, "C")
-		elif op == 0xF2:
-			self.SET(6, "D")
-		elif op == 0xF3:
-			self.SET(6, "E")
-		elif op == 0xF4:
-			self.SET(6, "H")
-		elif op == 0xF5:
-			self.SET(6, "L")
-		elif op == 0xF6:
-			self.SET(6, "M_HL")
-		elif op == 0xF7:
-			self.SET(6, "A")
-		elif op == 0xF8:
-			self.SET(7, "B")
-		elif op == 0xF9:
-			self.SET(7, "C")
-		elif op == 0xFA:
-			self.SET(7, "D")
-		elif op == 0xFB:
-			self.SET(7, "E")
-		elif op == 0xFC:
-			self.SET(7, "H")
-		elif op == 0xFD:
-			self.SET(7, "L")
-		elif op == 0xFE:
-			self.SET(7, "M_HL")
-		elif op == 0xFF:
-			self.SET(7, "A")
-
-	def RLC(self,reg=""):
-
-		if reg == "A": val = self.A
-		if reg == "B": val = self.B
-		if reg == "C": val = self.C
-		if reg == "D": val = self.D
-		if reg == "E": val = self.E
-		if reg == "H": val = self.H
-		if reg == "L": val = self.L
-		if reg == "M_HL": val = self.memory.read(self.get_HL())
+		self.CB_instructions[self.opcode]()
 
-		# C - Contains old bit 7 data
-		self.flags["C"] = (val & 0x80) >> 7
 
-		val = (val << 1) & 0xFF
+###### CB PREFIX HANDLERS ######
 
-		# Z - Set if result is zero
-		if val == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+# The CB prefix operations only differ per register in where the operand is read from and
+# written back to, so each operation is written once as a template and specialised below
+# into a method per register (and per bit), e.g. RLC_B, SWAP_M_HL, BIT_7_A
+CB_REGISTERS = ["B", "C", "D", "E", "H", "L", "M_HL", "A"]
+CB_ROTATES = ["RLC", "RRC", "RL", "RR", "SLA", "SRA", "SWAP", "SRL"]
+CB_BIT_OPERATIONS = ["BIT", "RES", "SET"]
 
-		# N - Reset
-		self.flags["N"] = 0
+# [read operand into val, write val back, clock cycles]
+CB_OPERANDS = {
+	"A": ["val = self.A", "self.A = val", 8],
+	"B": ["val = self.B", "self.B = val", 8],
+	"C": ["val = self.C", "self.C = val", 8],
+	"D": ["val = self.D", "self.D = val", 8],
+	"E": ["val = self.E", "self.E = val", 8],
+	"H": ["val = self.H", "self.H = val", 8],
+	"L": ["val = self.L", "self.L = val", 8],
+	"M_HL": ["HL = (self.H << 8) | self.L\n\t\tval = self.read(HL)", "self.write(HL, val)", 16]
+}
 
-		# H - Reset
-		self.flags["H"] = 0
-
-		if reg == "A": self.A = val
-		if reg == "B": self.B = val
-		if reg == "C": self.C = val
-		if reg == "D": self.D = val
-		if reg == "E": self.E = val
-		if reg == "H": self.H = val
-		if reg == "L": self.L = val
-		if reg == "M_HL": self.memory.write(self.get_HL(), val)
-
-		if reg != "M_HL":
-			self.cycles += 8
-		else:
-			self.cycles += 16
+# Source of each generated CB handler by name, kept for the Recompiler to inline
+CB_SOURCES = {}
 
-	def RRC(self,reg=""):
+CB_TEMPLATES = {
 
-		if reg == "A": val = self.A
-		if reg == "B": val = self.B
-		if reg == "C": val = self.C
-		if reg == "D": val = self.D
-		if reg == "E": val = self.E
-		if reg == "H": val = self.H
-		if reg == "L": val = self.L
-		if reg == "M_HL": val = self.memory.read(self.get_HL())
+	# Rotate left, old bit 7 to carry flag
+	# Z 0 0 C
+	"RLC": """
+	def {name}(self):
 
-		# C - Contains old bit 0 data
-		self.flags["C"] = val & 0x01
+		{read}
 
-		val = (val >> 1) & 0xFF
+		# C - Contains old bit 7 data
+		carry = val >> 7
+		val = ((val << 1) | carry) & 0xFF
 
 		# Z - Set if result is zero
-		if val == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
+		# H - Reset
+		self.F = (FLAG_Z if val == 0 else 0) | (FLAG_C if carry else 0)
+
+		{write}
+		self.cycles += {cycles}
+""",
+
+	# Rotate right, old bit 0 to carry flag
+	# Z 0 0 C
+	"RRC": """
+	def {name}(self):
+
+		{read}
+
+		# C - Contains old bit 0 data
+		carry = val & 0x01
+		val = (val >> 1) | (carry << 7)
 
+		# Z - Set if result is zero
+		# N - Reset
 		# H - Reset
-		self.flags["H"] = 0
-
-		if reg == "A": self.A = val
-		if reg == "B": self.B = val
-		if reg == "C": self.C = val
-		if reg == "D": self.D = val
-		if reg == "E": self.E = val
-		if reg == "H": self.H = val
-		if reg == "L": self.L = val
-		if reg == "M_HL": self.memory.write(self.get_HL(), val)
-
-		if reg != "M_HL":
-			self.cycles += 8
-		else:
-			self.cycles += 16
+		self.F = (FLAG_Z if val == 0 else 0) | (FLAG_C if carry else 0)
+
+		{write}
+		self.cycles += {cycles}
+""",
 
-	def RL(self, reg=""):
+	# Rotate left through carry flag
+	# Z 0 0 C
+	"RL": """
+	def {name}(self):
 
-		if reg == "A": val = self.A
-		if reg == "B": val = self.B
-		if reg == "C": val = self.C
-		if reg == "D": val = self.D
-		if reg == "E": val = self.E
-		if reg == "H": val = self.H
-		if reg == "L": val = self.L
-		if reg == "M_HL": val = self.memory.read(self.get_HL())
+		{read}
 
-		C = self.flags["C"]
+		C = (self.F & FLAG_C) >> 4
 
 		# C - Contains old bit 7 data
-		self.flags["C"] = (val & 0x80) >> 7
-
-		val = (val << 1) & 0xFF
-		val |= C
+		carry = val >> 7
+		val = ((val << 1) | C) & 0xFF
 
 		# Z - Set if result is zero
-		if val == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
-		if reg == "A": self.A = val
-		if reg == "B": self.B = val
-		if reg == "C": self.C = val
-		if reg == "D": self.D = val
-		if reg == "E": self.E = val
-		if reg == "H": self.H = val
-		if reg == "L": self.L = val
-		if reg == "M_HL": self.memory.write(self.get_HL(), val)
-
-		if reg != "M_HL":
-			self.cycles += 8
-		else:
-			self.cycles += 16
+		self.F = (FLAG_Z if val == 0 else 0) | (FLAG_C if carry else 0)
+
+		{write}
+		self.cycles += {cycles}
+""",
 
-	def RR(self, reg=""):
+	# Rotate right through carry flag
+	# Z 0 0 C
+	"RR": """
+	def {name}(self):
 
-		if reg == "A": val = self.A
-		if reg == "B": val = self.B
-		if reg == "C": val = self.C
-		if reg == "D": val = self.D
-		if reg == "E": val = self.E
-		if reg == "H": val = self.H
-		if reg == "L": val = self.L
-		if reg == "M_HL": val = self.memory.read(self.get_HL())
+		{read}
 
-		C = self.flags["C"]
+		C = (self.F & FLAG_C) >> 4
 
 		# C - Contains old bit 0 data
-		self.flags["C"] = val & 0x01
-
-		val = (val << 1) & 0xFF
-		val |= C
+		carry = val & 0x01
+		val = (val >> 1) | (C << 7)
 
 		# Z - Set if result is zero
-		if val == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
-		if reg == "A": self.A = val
-		if reg == "B": self.B = val
-		if reg == "C": self.C = val
-		if reg == "D": self.D = val
-		if reg == "E": self.E = val
-		if reg == "H": self.H = val
-		if reg == "L": self.L = val
-		if reg == "M_HL": self.memory.write(self.get_HL(), val)
-
-		if reg != "M_HL":
-			self.cycles += 8
-		else:
-			self.cycles += 16
+		self.F = (FLAG_Z if val == 0 else 0) | (FLAG_C if carry else 0)
 
-	def SLA(self, reg=""):
+		{write}
+		self.cycles += {cycles}
+""",
 
-		if reg == "A": val = self.A
-		if reg == "B": val = self.B
-		if reg == "C": val = self.C
-		if reg == "D": val = self.D
-		if reg == "E": val = self.E
-		if reg == "H": val = self.H
-		if reg == "L": val = self.L
-		if reg == "M_HL": val = self.memory.read(self.get_HL())
+	# Shift left into carry, bit 0 reset
+	# Z 0 0 C
+	"SLA": """
+	def {name}(self):
 
-		if val & 0x80:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
+		{read}
 
+		# C - Contains old bit 7 data
+		carry = val >> 7
 		val = (val << 1) & 0xFF
-		val &= 0xFE
 
 		# Z - Set if result is zero
-		if val == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
-		if reg == "A": self.A = val
-		if reg == "B": self.B = val
-		if reg == "C": self.C = val
-		if reg == "D": self.D = val
-		if reg == "E": self.E = val
-		if reg == "H": self.H = val
-		if reg == "L": self.L = val
-		if reg == "M_HL": self.memory.write(self.get_HL(), val)
-
-		if reg != "M_HL":
-			self.cycles += 8
-		else:
-			self.cycles += 16
+		self.F = (FLAG_Z if val == 0 else 0) | (FLAG_C if carry else 0)
 
-	def SRA(self, reg=""):
+		{write}
+		self.cycles += {cycles}
+""",
 
-		if reg == "A": val = self.A
-		if reg == "B": val = self.B
-		if reg == "C": val = self.C
-		if reg == "D": val = self.D
-		if reg == "E": val = self.E
-		if reg == "H": val = self.H
-		if reg == "L": val = self.L
-		if reg == "M_HL": val = self.memory.read(self.get_HL())
+	# Shift right into carry, bit 7 unchanged
+	# Z 0 0 C
+	"SRA": """
+	def {name}(self):
 
-		if val & 0x01:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
+		{read}
 
-		val = (val >> 1) & 0xFF
+		# C - Contains old bit 0 data
+		carry = val & 0x01
+		val = (val >> 1) | (val & 0x80)
 
 		# Z - Set if result is zero
-		if val == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
-		if reg == "A": self.A = val
-		if reg == "B": self.B = val
-		if reg == "C": self.C = val
-		if reg == "D": self.D = val
-		if reg == "E": self.E = val
-		if reg == "H": self.H = val
-		if reg == "L": self.L = val
-		if reg == "M_HL": self.memory.write(self.get_HL(), val)
-
-		if reg != "M_HL":
-			self.cycles += 8
-		else:
-			self.cycles += 16
+		self.F = (FLAG_Z if val == 0 else 0) | (FLAG_C if carry else 0)
 
-	def SWAP(self, reg=""):
+		{write}
+		self.cycles += {cycles}
+""",
 
-		if reg == "A": val = self.A
-		if reg == "B": val = self.B
-		if reg == "C": val = self.C
-		if reg == "D": val = self.D
-		if reg == "E": val = self.E
-		if reg == "H": val = self.H
-		if reg == "L": val = self.L
-		if reg == "M_HL": val = self.memory.read(self.get_HL())
+	# Swap upper and lower nibbles
+	# Z 0 0 0
+	"SWAP": """
+	def {name}(self):
 
-		high = (val & 0xFF00) >> 8
-		low = val & 0x00FF
-		val = (low << 8) | high
+		{read}
 
-		# Z - Set if result is zero
-		if val == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		val = ((val & 0x0F) << 4) | (val >> 4)
 
+		# Z - Set if result is zero
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
 		# C - Reset
-		self.flags["C"] = 0
-
-		if reg == "A": self.A = val
-		if reg == "B": self.B = val
-		if reg == "C": self.C = val
-		if reg == "D": self.D = val
-		if reg == "E": self.E = val
-		if reg == "H": self.H = val
-		if reg == "L": self.L = val
-		if reg == "M_HL": self.memory.write(self.get_HL(), val)
-
-		if reg != "M_HL":
-			self.cycles += 8
-		else:
-			self.cycles += 16
+		self.F = FLAG_Z if val == 0 else 0
 
-	def SRL(self, reg=""):
+		{write}
+		self.cycles += {cycles}
+""",
 
-		if reg == "A": val = self.A
-		if reg == "B": val = self.B
-		if reg == "C": val = self.C
-		if reg == "D": val = self.D
-		if reg == "E": val = self.E
-		if reg == "H": val = self.H
-		if reg == "L": val = self.L
-		if reg == "M_HL": val = self.memory.read(self.get_HL())
+	# Shift right into carry, bit 7 reset
+	# Z 0 0 C
+	"SRL": """
+	def {name}(self):
 
-		if val & 0x01:
-			self.flags["C"] = 1
-		else:
-			self.flags["C"] = 0
+		{read}
 
-		val = (val >> 1) & 0xFF
-		val &= 0x7F
+		# C - Contains old bit 0 data
+		carry = val & 0x01
+		val = val >> 1
 
 		# Z - Set if result is zero
-		if val == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
-
 		# N - Reset
-		self.flags["N"] = 0
-
 		# H - Reset
-		self.flags["H"] = 0
-
-		if reg == "A": self.A = val
-		if reg == "B": self.B = val
-		if reg == "C": self.C = val
-		if reg == "D": self.D = val
-		if reg == "E": self.E = val
-		if reg == "H": self.H = val
-		if reg == "L": self.L = val
-		if reg == "M_HL": self.memory.write(self.get_HL(), val)
-
-		if reg != "M_HL":
-			self.cycles += 8
-		else:
-			self.cycles += 16
-
-	def BIT(self, b=0, reg=""):
-
-		if reg == "A": val = self.A
-		if reg == "B": val = self.B
-		if reg == "C": val = self.C
-		if reg == "D": val = self.D
-		if reg == "E": val = self.E
-		if reg == "H": val = self.H
-		if reg == "L": val = self.L
-		if reg == "M_HL": val = self.memory.read(self.get_HL())
-
-		# Z - Set if bit b of val is 0
-		if val & (0x01 << b) == 0:
-			self.flags["Z"] = 1
-		else:
-			self.flags["Z"] = 0
+		self.F = (FLAG_Z if val == 0 else 0) | (FLAG_C if carry else 0)
 
-		# N - Reset
-		self.flags["N"] = 0
+		{write}
+		self.cycles += {cycles}
+""",
+
+	# Test bit b
+	# Z 0 1 -
+	"BIT": """
+	def {name}(self):
 
+		{read}
+
+		# Z - Set if bit {bit} of val is 0
+		# N - Reset
 		# H - Set
-		self.flags["H"] = 1
-
-		if reg == "A": self.A = val
-		if reg == "B": self.B = val
-		if reg == "C": self.C = val
-		if reg == "D": self.D = val
-		if reg == "E": self.E = val
-		if reg == "H": self.H = val
-		if reg == "L": self.L = val
-		if reg == "M_HL": self.memory.write(self.get_HL(), val)
-
-		if reg != "M_HL":
-			self.cycles += 8
-		else:
-			self.cycles += 16
-
-	def RES(self, b=0, reg=""):
-
-		if reg == "A": val = self.A
-		if reg == "B": val = self.B
-		if reg == "C": val = self.C
-		if reg == "D": val = self.D
-		if reg == "E": val = self.E
-		if reg == "H": val = self.H
-		if reg == "L": val = self.L
-		if reg == "M_HL": val = self.memory.read(self.get_HL())
-
-		val &= ~(0x01 << b)
-
-		if reg == "A": self.A = val
-		if reg == "B": self.B = val
-		if reg == "C": self.C = val
-		if reg == "D": self.D = val
-		if reg == "E": self.E = val
-		if reg == "H": self.H = val
-		if reg == "L": self.L = val
-		if reg == "M_HL": self.memory.write(self.get_HL(), val)
-
-		if reg != "M_HL":
-			self.cycles += 8
-		else:
-			self.cycles += 16
-
-	def SET(self, b=0, reg=""):
-
-		if reg == "A": val = self.A
-		if reg == "B": val = self.B
-		if reg == "C": val = self.C
-		if reg == "D": val = self.D
-		if reg == "E": val = self.E
-		if reg == "H": val = self.H
-		if reg == "L": val = self.L
-		if reg == "M_HL": val = self.memory.read(self.get_HL())
-
-		val |= (0x01 << b)
-
-		if reg == "A": self.A = val
-		if reg == "B": self.B = val
-		if reg == "C": self.C = val
-		if reg == "D": self.D = val
-		if reg == "E": self.E = val
-		if reg == "H": self.H = val
-		if reg == "L": self.L = val
-		if reg == "M_HL": self.memory.write(self.get_HL(), val)
-
-		if reg != "M_HL":
-			self.cycles += 8
-		else:
-			self.cycles += 16
+		self.F = (self.F & FLAG_C) | FLAG_H | (FLAG_Z if val & {mask} == 0 else 0)
+
+		self.cycles += {cycles}
+""",
+
+	# Reset bit b
+	# - - - -
+	"RES": """
+	def {name}(self):
+
+		{read}
+
+		val &= ~{mask}
+
+		{write}
+		self.cycles += {cycles}
+""",
+
+	# Set bit b
+	# - - - -
+	"SET": """
+	def {name}(self):
+
+		{read}
+
+		val |= {mask}
+
+		{write}
+		self.cycles += {cycles}
+"""
+}
+
+def build_CB_handlers():
+
+	for reg in CB_REGISTERS:
+
+		read, write, cycles = CB_OPERANDS[reg]
+
+		handlers = []
+		for operation in CB_ROTATES:
+			handlers.append([operation + "_" + reg, operation, 0])
+		for operation in CB_BIT_OPERATIONS:
+			for b in range(0, 8):
+				handlers.append([operation + "_" + str(b) + "_" + reg, operation, b])
+
+		for name, operation, b in handlers:
+			source = CB_TEMPLATES[operation].format(name=name, read=read, write=write, cycles=cycles, bit=b, mask=hex(0x01 << b))
+			source = dedent(source)
+			CB_SOURCES[name] = source
+			namespace = {}
+			exec(compile(source, "<CB " + name + ">", "exec"), globals(), namespace)
+			setattr(CPU, name, namespace[name])
+
+build_CB_handlers()
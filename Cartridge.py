@@ -0,0 +1,306 @@
+import mmap
+import time
+
+
+# Cartridge with no memory bank controller, 32KiB of ROM and optionally 8KiB of RAM
+# The ROM file is memory mapped, banks are handed to Memory as lists of page views so
+# switching a bank only swaps entries in the page table and never copies
+class Cartridge:
+
+    # Cartridge type byte at 0x0147 and the class that handles it
+    TYPES = {}
+
+    # External RAM size in bytes by the byte at 0x0149
+    RAM_SIZES = {0x00: 0, 0x01: 0x800, 0x02: 0x2000, 0x03: 0x8000, 0x04: 0x20000, 0x05: 0x10000}
+
+    def __init__(self, rom):
+
+        self.rom = rom
+        self.rom_banks = len(rom) // 0x4000
+
+        # Page views of each ROM bank, made when the bank is first mapped
+        self.bank_pages = [None] * self.rom_banks
+
+        # Small RAMs are padded out to a whole 8KiB bank
+        ram_size = self.RAM_SIZES.get(rom[0x0149], 0)
+        if ram_size:
+            ram_size = max(ram_size, 0x2000)
+        self.ram = bytearray(ram_size)
+        self.ram_banks = ram_size // 0x2000
+        self.ram_pages = []
+        view = memoryview(self.ram)
+        for bank in range(0, self.ram_banks):
+            self.ram_pages.append([view[address:address + 0x100] for address in range(bank * 0x2000, (bank + 1) * 0x2000, 0x100)])
+
+        self.ram_enabled = False
+        self.rom_bank = 1
+        self.ram_bank = 0
+
+        self.memory = None
+
+    # Load a ROM file and make the cartridge its header asks for
+    @classmethod
+    def load(cls, rom_file):
+
+        with open(rom_file, 'rb') as file:
+            size = file.seek(0, 2)
+            if size >= 0x8000 and size % 0x4000 == 0:
+                rom = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+            else:
+                # Odd sized or small ROMs are padded, which needs a copy
+                file.seek(0)
+                data = bytearray(file.read())
+                data += bytearray(max(0x8000, -(-len(data) // 0x4000) * 0x4000) - len(data))
+                rom = memoryview(bytes(data))
+
+        return cls.TYPES.get(rom[0x0147], Cartridge)(rom)
+
+    # Hook the cartridge into memory and map the initial banks
+    def attach(self, memory):
+
+        self.memory = memory
+        memory.map_rom(0x0000, self.pages(0))
+        memory.map_rom(0x4000, self.pages(self.rom_bank))
+        self.map_ram()
+
+    # Page views of a ROM bank
+    def pages(self, bank):
+
+        bank %= self.rom_banks
+        if self.bank_pages[bank] is None:
+            start = bank * 0x4000
+            self.bank_pages[bank] = [self.rom[address:address + 0x100] for address in range(start, start + 0x4000, 0x100)]
+
+        return self.bank_pages[bank]
+
+    def map_rom(self):
+
+        self.memory.map_rom(0x4000, self.pages(self.rom_bank))
+
+    def map_ram(self):
+
+        # Cartridges without a controller have their RAM always enabled
+        if self.ram_banks:
+            self.memory.map_ram(self.ram_pages[0])
+        else:
+            self.memory.map_ram_handlers(self.read_disabled, self.write_disabled)
+
+    # Writes to the ROM area are how the game talks to the bank controller
+    def write(self, address, data):
+
+        pass
+
+    def read_disabled(self, address):
+
+        return 0xFF
+
+    def write_disabled(self, address, data):
+
+        pass
+
+
+# MBC1, up to 2MiB of ROM and 32KiB of RAM
+class MBC1(Cartridge):
+
+    def __init__(self, rom):
+
+        super().__init__(rom)
+
+        # 5 bit bank register, 2 bit upper bank register and banking mode
+        self.bank1 = 1
+        self.bank2 = 0
+        self.mode = 0
+
+        # Bank at 0x0000-0x3FFF, only changes in mode 1
+        self.low_bank = 0
+
+    def write(self, address, data):
+
+        if address < 0x2000:
+            enabled = (data & 0x0F) == 0x0A
+            if enabled != self.ram_enabled:
+                self.ram_enabled = enabled
+                self.map_ram()
+
+        elif address < 0x4000:
+            # Bank 0 can't be selected here, it reads as bank 1
+            self.bank1 = (data & 0x1F) or 1
+            self.map_rom()
+
+        elif address < 0x6000:
+            self.bank2 = data & 0x03
+            self.map_rom()
+            self.map_ram()
+
+        else:
+            self.mode = data & 0x01
+            self.map_rom()
+            self.map_ram()
+
+    def map_rom(self):
+
+        bank = ((self.bank2 << 5) | self.bank1) % self.rom_banks
+        if bank != self.rom_bank:
+            self.rom_bank = bank
+            self.memory.map_rom(0x4000, self.pages(bank))
+
+        # In mode 1 the upper bank register also applies to 0x0000-0x3FFF
+        low_bank = ((self.bank2 << 5) if self.mode else 0) % self.rom_banks
+        if low_bank != self.low_bank:
+            self.low_bank = low_bank
+            self.memory.map_rom(0x0000, self.pages(low_bank))
+
+    def map_ram(self):
+
+        if not self.ram_enabled or not self.ram_banks:
+            self.memory.map_ram_handlers(self.read_disabled, self.write_disabled)
+            return
+
+        # In mode 1 the upper bank register selects the RAM bank
+        self.ram_bank = (self.bank2 if self.mode else 0) % self.ram_banks
+        self.memory.map_ram(self.ram_pages[self.ram_bank])
+
+
+# MBC3, up to 2MiB of ROM, 32KiB of RAM and a real time clock
+class MBC3(Cartridge):
+
+    # Seconds, minutes, hours, day low, day high / halt / day carry
+    RTC_REGISTERS = 5
+
+    def __init__(self, rom):
+
+        super().__init__(rom)
+
+        # The clock runs off the host clock, rtc_start is when it read zero
+        self.rtc_start = time.time()
+        self.rtc_halted = None
+        self.rtc_carry = 0
+        self.rtc_latched = [0] * self.RTC_REGISTERS
+        self.rtc_latch = 0xFF
+
+    def write(self, address, data):
+
+        if address < 0x2000:
+            enabled = (data & 0x0F) == 0x0A
+            if enabled != self.ram_enabled:
+                self.ram_enabled = enabled
+                self.map_ram()
+
+        elif address < 0x4000:
+            bank = (data & 0x7F) or 1
+            if bank != self.rom_bank:
+                self.rom_bank = bank
+                self.map_rom()
+
+        elif address < 0x6000:
+            # 0x00-0x03 select a RAM bank, 0x08-0x0C an RTC register
+            if data != self.ram_bank:
+                self.ram_bank = data
+                self.map_ram()
+
+        else:
+            # Writing 0x00 then 0x01 latches the clock into the registers
+            if self.rtc_latch == 0x00 and data == 0x01:
+                self.latch_rtc()
+            self.rtc_latch = data
+
+    def map_ram(self):
+
+        if not self.ram_enabled:
+            self.memory.map_ram_handlers(self.read_disabled, self.write_disabled)
+        elif 0x08 <= self.ram_bank <= 0x0C:
+            self.memory.map_ram_handlers(self.read_rtc, self.write_rtc)
+        elif self.ram_banks:
+            self.memory.map_ram(self.ram_pages[self.ram_bank % self.ram_banks])
+        else:
+            self.memory.map_ram_handlers(self.read_disabled, self.write_disabled)
+
+    # Seconds the clock has counted
+    def rtc_seconds(self):
+
+        if self.rtc_halted is not None:
+            return self.rtc_halted
+        return int(time.time() - self.rtc_start)
+
+    def latch_rtc(self):
+
+        seconds = self.rtc_seconds()
+        days = seconds // 86400
+
+        # The day counter is 9 bits, the carry stays set once it overflows
+        if days > 0x1FF:
+            self.rtc_carry = 1
+            days &= 0x1FF
+            self.rtc_start += 0x200 * 86400
+            if self.rtc_halted is not None:
+                self.rtc_halted -= 0x200 * 86400
+
+        self.rtc_latched = [
+            seconds % 60,
+            seconds // 60 % 60,
+            seconds // 3600 % 24,
+            days & 0xFF,
+            (days >> 8) | (0x40 if self.rtc_halted is not None else 0) | (self.rtc_carry << 7)
+        ]
+
+    def read_rtc(self, address):
+
+        return self.rtc_latched[self.ram_bank - 0x08]
+
+    # Setting a register restarts the clock from the latched time with that register changed
+    def write_rtc(self, address, data):
+
+        registers = self.rtc_latched
+        registers[self.ram_bank - 0x08] = data
+
+        days = ((registers[4] & 0x01) << 8) | registers[3]
+        seconds = days * 86400 + registers[2] * 3600 + registers[1] * 60 + registers[0]
+        self.rtc_carry = registers[4] >> 7
+
+        if registers[4] & 0x40:
+            self.rtc_halted = seconds
+        else:
+            self.rtc_halted = None
+            self.rtc_start = time.time() - seconds
+
+
+# MBC5, up to 8MiB of ROM and 128KiB of RAM
+class MBC5(Cartridge):
+
+    def write(self, address, data):
+
+        if address < 0x2000:
+            enabled = (data & 0x0F) == 0x0A
+            if enabled != self.ram_enabled:
+                self.ram_enabled = enabled
+                self.map_ram()
+
+        elif address < 0x4000:
+            # 9 bit bank number, bank 0 can be selected
+            if address < 0x3000:
+                bank = (self.rom_bank & 0x100) | data
+            else:
+                bank = (self.rom_bank & 0xFF) | ((data & 0x01) << 8)
+            if bank != self.rom_bank:
+                self.rom_bank = bank
+                self.map_rom()
+
+        elif address < 0x6000:
+            bank = data & 0x0F
+            if bank != self.ram_bank:
+                self.ram_bank = bank
+                self.map_ram()
+
+    def map_ram(self):
+
+        if self.ram_enabled and self.ram_banks:
+            self.memory.map_ram(self.ram_pages[self.ram_bank % self.ram_banks])
+        else:
+            self.memory.map_ram_handlers(self.read_disabled, self.write_disabled)
+
+
+Cartridge.TYPES = {
+    0x01: MBC1, 0x02: MBC1, 0x03: MBC1,
+    0x0F: MBC3, 0x10: MBC3, 0x11: MBC3, 0x12: MBC3, 0x13: MBC3,
+    0x19: MBC5, 0x1A: MBC5, 0x1B: MBC5, 0x1C: MBC5, 0x1D: MBC5, 0x1E: MBC5
+}
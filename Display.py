@@ -0,0 +1,94 @@
+import pygame
+import sys
+import threading
+
+
+# Optional pygame frontend, presents the GPU framebuffer in a window
+# Only imported when the emulator is not running headless
+# Frames are shown by a presentation thread so the emulation never waits on the window,
+# the window is created on that thread too since SDL wants it used from the thread that made it
+class Display:
+
+    # Longest the presenter waits for a frame before it checks for window events again
+    EVENT_INTERVAL = 0.05
+
+    def __init__(self, width=160, height=144):
+
+        self.width = width
+        self.height = height
+
+        # Two frame buffers, the emulation fills back and the presenter shows front
+        # They are swapped when the presenter takes a new frame
+        self.back = bytearray(width * height)
+        self.front = bytearray(width * height)
+        self.back_palette = None
+        self.front_palette = None
+
+        # Set while back holds a frame the presenter hasn't taken
+        self.ready = False
+        self.condition = threading.Condition()
+
+        # Frames replaced by a newer one before the presenter got to them
+        self.dropped = 0
+
+        self.running = True
+        self.thread = threading.Thread(target=self.present_frames, name="Display", daemon=True)
+        self.thread.start()
+
+    # Hand a finished frame to the presenter, called from the emulation and never blocks on the window
+    # The framebuffer holds a colour 0-3 per pixel, palette is their RGB
+    def present(self, framebuffer, palette):
+
+        # The window was closed
+        if not self.running:
+            sys.exit()
+
+        with self.condition:
+            # If the presenter is behind, the frame it hasn't taken yet is dropped for this one
+            if self.ready:
+                self.dropped += 1
+            self.back[:] = framebuffer
+            self.back_palette = palette
+            self.ready = True
+            self.condition.notify()
+
+    # Stop the presentation thread and close the window
+    def close(self):
+
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not threading.current_thread():
+            self.thread.join()
+
+    # The presentation thread, shows each frame it takes and handles the window's events
+    def present_frames(self):
+
+        # Start the display
+        pygame.init()
+        screen = pygame.display.set_mode([self.width, self.height], pygame.DOUBLEBUF)
+
+        while self.running:
+
+            with self.condition:
+                if not self.ready:
+                    self.condition.wait(self.EVENT_INTERVAL)
+                frame = self.ready
+                if frame:
+                    self.front, self.back = self.back, self.front
+                    self.front_palette = self.back_palette
+                    self.ready = False
+
+            if frame:
+                # Shown as an 8 bit surface so the colours are looked up as it is blitted
+                surface = pygame.image.frombuffer(self.front, (self.width, self.height), "P")
+                surface.set_palette(self.front_palette)
+                screen.blit(surface, (0, 0))
+                pygame.display.flip()
+
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.running = False
+
+        pygame.display.quit()
+        pygame.quit()
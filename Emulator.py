@@ -0,0 +1,156 @@
+from CPU import CPU
+from GPU import GPU
+from Memory import Memory
+from Recompiler import Recompiler
+from Scheduler import Scheduler
+from Timer import Timer
+
+
+# Wires the machine together and drives it in batches
+# Each run_* call executes a tight loop and only returns at the requested boundary
+class Emulator:
+
+    def __init__(self, rom_file, display=None, recompile=True):
+
+        self.memory = Memory(rom_file)
+
+        self.cpu = CPU(self.memory)
+
+        # Timed events for the devices, the CPU runs until the earliest one is due
+        self.scheduler = Scheduler(self.cpu)
+        self.memory.scheduler = self.scheduler
+
+        self.timer = Timer(self.memory, self.scheduler)
+
+        # Without a display the GPU runs headless
+        self.gpu = GPU(self.memory, self.scheduler, display)
+
+        # Optional Tracer, records every instruction while set
+        self.tracer = None
+
+        # Translates hot blocks of code into Python functions, None to always interpret
+        self.recompiler = Recompiler(self.cpu) if recompile else None
+
+    # Number of frames completed so far
+    @property
+    def frames(self):
+
+        return self.gpu.counter
+
+    # The decode step for the run loops
+    # When tracing it is wrapped to record each instruction, otherwise there is no extra cost
+    def decoder(self):
+
+        cpu = self.cpu
+        decode = cpu.decode
+        if self.tracer is None:
+            return decode
+
+        record = self.tracer.record
+
+        def traced_decode():
+            PC = cpu.PC
+            decode()
+            record(cpu, PC)
+
+        return traced_decode
+
+    # Execute a single instruction, take an interrupt or idle while halted, returns the clock cycles it took
+    def step(self):
+
+        cpu = self.cpu
+        memory = self.memory
+        cycles_before = cpu.cycles
+
+        # Took an interrupt, or still halted and waited for the next event
+        if memory.interrupt_pending and (cpu.interrupt() or memory.halted):
+            if memory.halted:
+                self.idle()
+        else:
+            self.decoder()()
+            cpu.execute()
+
+        if cpu.cycles >= self.scheduler.next_time:
+            self.scheduler.run(cpu.cycles)
+        return cpu.cycles - cycles_before
+
+    # While halted nothing can wake the CPU before the next event, so time jumps straight to it
+    def idle(self):
+
+        self.cpu.cycles = max(self.cpu.cycles, self.scheduler.next_time)
+
+    # Run for at least n clock cycles, returns the clock cycles actually run
+    # Instructions are never split, so this can overshoot by part of one instruction
+    def run_cycles(self, n):
+
+        start = self.cpu.cycles
+        self.run(max_cycles=n)
+        return self.cpu.cycles - start
+
+    # Run until n more frames have been completed, returns the clock cycles run
+    def run_frames(self, n):
+
+        start = self.cpu.cycles
+        self.run(max_frames=n)
+        return self.cpu.cycles - start
+
+    # Run until predicate(emulator) is true, checked after every instruction or recompiled block
+    # Gives up after max_cycles if given, returns whether the predicate was met
+    def run_until(self, predicate, max_cycles=None):
+
+        return self.run(max_cycles=max_cycles, predicate=predicate)
+
+    # The loop behind the run_* calls, stops at whichever limit comes first
+    # Returns whether the predicate was met
+    def run(self, max_cycles=None, max_frames=None, predicate=None):
+
+        cpu = self.cpu
+        gpu = self.gpu
+        memory = self.memory
+        scheduler = self.scheduler
+        run_events = scheduler.run
+        decode = self.decoder()
+        execute = cpu.execute
+
+        # Traced runs interpret every instruction so each one is recorded
+        recompiler = self.recompiler if self.tracer is None else None
+        if recompiler is not None:
+            blocks = recompiler.blocks
+            heat = recompiler.heat
+            compile_block = recompiler.compile
+            threshold = recompiler.THRESHOLD
+
+        cycles = cpu.cycles
+        cycle_target = float("inf") if max_cycles is None else cycles + max_cycles
+        frame_target = float("inf") if max_frames is None else gpu.counter + max_frames
+        while cycles < cycle_target and gpu.counter < frame_target:
+            if predicate is not None and predicate(self):
+                return True
+
+            # Memory keeps this at 0 unless an interrupt can be taken, an EI is waiting or the CPU is halted
+            pending = memory.interrupt_pending
+            if pending and (cpu.interrupt() or memory.halted):
+                if memory.halted:
+                    self.idle()
+
+            # The instruction after an EI is interpreted, so interrupts are enabled right after it
+            # rather than after a whole block
+            elif recompiler is not None and not pending and (block := blocks[cpu.PC]) is not None:
+                block()
+
+            else:
+                if recompiler is not None and not pending:
+                    PC = cpu.PC
+                    heat[PC] += 1
+                    if heat[PC] == threshold:
+                        compile_block(PC)
+
+                decode()
+                execute()
+
+            # The devices are only touched when one of their events is due
+            cycles = cpu.cycles
+            if cycles >= scheduler.next_time:
+                run_events(cycles)
+
+        return predicate is not None and predicate(self)
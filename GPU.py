@@ -1,135 +1,420 @@
-import pygame
-import math
-import sys
-from threading import Thread
+# numpy is optional, without it tiles are decoded a row at a time through a lookup table
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
+from Memory import INTERRUPT_VBLANK, INTERRUPT_STAT
 
+# Cleared Memory.dirty_tiles
+CLEAN_TILES = bytes(384)
 
-class GPU:
+# Tile numbers 0x00-0x7F in a map using signed addressing (LCDC bit 4 clear) are the tiles at
+# 0x9000-0x97FF, and 0x80-0xFF the ones at 0x8800-0x8FFF
+# Both modes index the same 384 decoded tiles, this is the tile slot for each number
+SIGNED_SLOTS = [tile + 0x100 if tile < 0x80 else tile for tile in range(0, 0x100)]
 
-    def __init__(self, memory):
-
-        # Start the display
-        pygame.init()
-        self.screen = pygame.display.set_mode([160,144], pygame.DOUBLEBUF)
-        self.background = pygame.Surface((256,256))
-        self.white = (175, 200, 70 , 255)
-        self.light_grey = (130, 170, 100, 255)
-        self.dark_grey = (35, 110, 95, 255)
-        self.black = (10, 40, 85, 255)
-        self.cycles = 0
-        self.memory = memory
-        self.counter = 0
-        self.FRAME_SKIP = 1
-
-        self.tile = [
-            [(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0)],
-            [(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0)],
-            [(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0)],
-            [(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0)],
-            [(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0)],
-            [(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0)],
-            [(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0)],
-            [(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0),(0,0,0)]
-        ]
-
-        self.previous_tiles = [0x100 for i in range(0,0x400)]
-        self.first_render = True
-
-    def update(self, cycles_passed):
-
-        self.cycles += cycles_passed
-
-        LY = int(self.cycles / 456)
-        if LY > 153: LY = 153
-        self.memory.write(0xFF44, LY)
-
-        # Vblank period begin
-
-        # 70220 clock cycles is one frame
-        if self.cycles >= 70220:
-            self.cycles = 0
-            if self.counter % self.FRAME_SKIP == 0:
-                self.render_background()
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        pygame.display.quit()
-                        pygame.quit()
-                        sys.exit()
-            self.counter += 1
 
-    def render_background(self):
+class GPU:
 
-        # Initialized the background
-        self.background_pixels = pygame.PixelArray(self.background)
+    # Screen dimensions in pixels
+    WIDTH = 160
+    HEIGHT = 144
 
-        # Read each byte at BG Map Data 1
-        for index in range(0, 0x400):
+    # Every line takes 456 clock cycles, 80 searching OAM (mode 2), 172 transferring pixels
+    # to the screen (mode 3) and the rest in HBlank (mode 0)
+    # After the 144 visible lines come 10 lines of VBlank (mode 1)
+    LINE_CYCLES = 456
+    OAM_CYCLES = 80
+    TRANSFER_CYCLES = 172
+    LINES = 154
 
-            # Get the current tile
-            current_tile = self.memory.read(0x9800 + index)
+    # STAT bits, the interrupt enables for each mode and for LY=LYC
+    STAT_COINCIDENCE = 0x04
+    STAT_MODE_INTERRUPTS = [0x08, 0x10, 0x20, 0x00]
+    STAT_COINCIDENCE_INTERRUPT = 0x40
 
-            # Only bother updating if it changed
-            if self.previous_tiles[index] != current_tile:
+    def __init__(self, memory, scheduler, display=None):
 
-                # Tile data is 16 bytes long
-                tile_data_index = 0x8000 + current_tile * 16
+        # The display is optional, without one the GPU runs headless and
+        # frames are only rendered into the framebuffer
+        self.display = display
 
-                # Get each portion of the tile data in increments of 2 bytes (a row at a time)
-                n = 0
-                for i in range(0,16,2):
+        # 256x256 composed maps as shades 0-3, made when first used, by map_key
+        # The background and window both draw from these
+        self.backgrounds = [None] * 4
 
-                    byte2 = self.memory.read(tile_data_index + i)
-                    byte1 = self.memory.read(tile_data_index + i + 1)
+        # Flags for the composed maps that are out of date with VRAM
+        self.stale_backgrounds = bytearray(4)
 
-                    # Determine the color of each pixel (2 bits)
-                    for b in range(0,8):
+        # The 160x144 visible screen as colours 0-3, the palettes are already applied since they
+        # can change between lines, the RGB of each colour is only looked up when it is presented
+        self.framebuffer = bytearray(self.WIDTH * self.HEIGHT)
 
-                        if byte1 & (0x80 >> b): c1 = 1
-                        else: c1 = 0
-
-                        if byte2 & (0x80 >> b): c2 = 1
-                        else: c2 = 0
+        self.white = (175, 200, 70)
+        self.light_grey = (130, 170, 100)
+        self.dark_grey = (35, 110, 95)
+        self.black = (10, 40, 85)
+        self.memory = memory
+        self.scheduler = scheduler
+        self.counter = 0
 
-                        s = (c2 << 1) + c1
+        # Whether the current frame is drawn and presented, the Pacer clears it between frames
+        # to skip drawing, the emulation itself never skips
+        self.draw_frame = True
+
+        # Clock cycle the current line started on, and where in the line the current mode ends
+        # Each mode change is a scheduled event
+        self.line_start = 0
+        self.LY = 0
+        self.mode = 0
+        self.end_mode_at(self.LINE_CYCLES)
+
+        # The LCD starts off, until the BIOS switches it on LY stays 0
+        self.lcd_on = False
+
+        # RGB of each colour
+        self.palette = [self.white, self.light_grey, self.dark_grey, self.black]
+
+        # Translation tables from shade to colour, by palette register value
+        self.palette_tables = {}
+
+        # Sprites on each visible line, highest priority first, rebuilt at the start of each frame
+        self.line_sprites = [[] for i in range(0, self.HEIGHT)]
+
+        # Line of the window drawn next, it only advances on lines that show the window
+        self.window_line = 0
+
+        if numpy is not None:
+            self.background_arrays = [None] * 4
+
+            # Tile data for the 384 tiles at 0x8000-0x97FF and the two 32x32 tile maps at 0x9800 and 0x9C00
+            self.tile_data = numpy.frombuffer(memory.bytes, dtype=numpy.uint8, count=0x1800, offset=0x8000).reshape(384, 8, 2)
+            self.tile_maps = numpy.frombuffer(memory.bytes, dtype=numpy.uint8, count=0x800, offset=0x9800).reshape(2, 32, 32)
+            self.dirty_tiles = numpy.frombuffer(memory.dirty_tiles, dtype=numpy.uint8)
+            self.signed_slots = numpy.array(SIGNED_SLOTS, dtype=numpy.uint16)
+
+            # Decoded shades of all 384 tiles
+            self.tiles = numpy.zeros((384, 8, 8), dtype=numpy.uint8)
+
+        # Shades of a row of 8 pixels, by the row's two bytes of tile data
+        self.rows = {}
+
+        # Decoded rows of all 384 tiles, each redecode makes a new list
+        self.tile_rows = [None] * 384
+
+        # Rows drawn at each position of each composed map, by map_key
+        self.previous_rows = [None] * 4
+
+    # Move on to the next mode, and the next line at the end of HBlank or a VBlank line
+    # Run by the scheduler at the end of each mode
+    def next_mode(self, time):
+
+        registers = self.memory.bytes
+
+        if self.mode == 2:
+            self.set_mode(3, self.OAM_CYCLES + self.TRANSFER_CYCLES)
+            return
+
+        if self.mode == 3:
+            # The line is drawn with whatever the registers hold as it is transferred
+            if self.draw_frame and registers[0xFF40] & 0x80:
+                self.render_line(self.LY)
+            self.set_mode(0, self.LINE_CYCLES)
+            return
+
+        self.line_start = time
+        LY = self.LY + 1
+        if LY == self.LINES:
+            LY = 0
+
+        if not registers[0xFF40] & 0x80:
+            # The screen is off, nothing is drawn and LY reads 0, but lines keep passing
+            # so frames are still counted at the usual rate
+            self.lcd_on = False
+            self.LY = LY
+            if LY == self.HEIGHT:
+                self.counter += 1
+            registers[0xFF44] = 0
+            registers[0xFF41] &= 0xF8
+            self.mode = 0
+            self.end_mode_at(self.LINE_CYCLES)
+            return
+
+        if not self.lcd_on:
+            # Switched back on, drawing restarts from the top
+            self.lcd_on = True
+            LY = 0
+
+        # LY belongs to the GPU, it is stored directly rather than written like a CPU store
+        self.LY = LY
+        registers[0xFF44] = LY
+
+        if LY == registers[0xFF45]:
+            registers[0xFF41] |= self.STAT_COINCIDENCE
+            if registers[0xFF41] & self.STAT_COINCIDENCE_INTERRUPT:
+                self.memory.request_interrupt(INTERRUPT_STAT)
+        else:
+            registers[0xFF41] &= ~self.STAT_COINCIDENCE & 0xFF
+
+        if LY < self.HEIGHT:
+            if LY == 0:
+                self.index_sprites()
+                self.window_line = 0
+            self.set_mode(2, self.OAM_CYCLES)
+
+        elif LY == self.HEIGHT:
+            # Vblank period begin
+            self.set_mode(1, self.LINE_CYCLES)
+            self.memory.request_interrupt(INTERRUPT_VBLANK)
+
+            if self.draw_frame and self.display is not None:
+                self.render()
+            self.counter += 1
 
-                        if s == 0:
-                            color = self.white
-                        elif s == 1:
-                            color = self.light_grey
-                        elif s == 2:
-                            color = self.dark_grey
-                        elif s == 3:
-                            color = self.black
-                        else:
-                            color = (255,0,0) # bad tiles are red
+        else:
+            self.end_mode_at(self.LINE_CYCLES)
+
+    def set_mode(self, mode, mode_end):
 
-                        self.tile[n][b] = color
+        self.mode = mode
+        self.end_mode_at(mode_end)
+
+        registers = self.memory.bytes
+        registers[0xFF41] = (registers[0xFF41] & 0xFC) | mode
+        if registers[0xFF41] & self.STAT_MODE_INTERRUPTS[mode]:
+            self.memory.request_interrupt(INTERRUPT_STAT)
+
+    # Schedule the end of the current mode, mode_end is in clock cycles from the start of the line
+    def end_mode_at(self, mode_end):
+
+        self.mode_end = mode_end
+        self.scheduler.schedule(self.line_start + mode_end, self.next_mode)
+
+    # Draw line LY of the screen from the background, window and sprites using the current registers
+    def render_line(self, LY):
+
+        memory = self.memory
+        registers = memory.bytes
+        LCDC = registers[0xFF40]
+
+        # Tiles written since the last line are redecoded first
+        if memory.tile_map_dirty or 1 in memory.dirty_tiles:
+            self.update_tiles()
+
+        if not LCDC & 0x01:
+            # Background and window disabled, the line is blank
+            line = bytes(self.WIDTH)
+        else:
+            background = self.get_background(self.map_key(LCDC & 0x08, LCDC))
+            row = ((LY + registers[0xFF42]) & 0xFF) * 256
+            SCX = registers[0xFF43]
+            if SCX <= 256 - self.WIDTH:
+                line = background[row + SCX:row + SCX + self.WIDTH]
+            else:
+                # The line wraps around the right edge of the map
+                line = background[row + SCX:row + 256] + background[row:row + SCX + self.WIDTH - 256]
+
+            # The window covers the background from (WX - 7, WY) to the bottom right of the screen
+            WX = registers[0xFF4B] - 7
+            if LCDC & 0x20 and LY >= registers[0xFF4A] and WX < self.WIDTH:
+                window = self.get_background(self.map_key(LCDC & 0x40, LCDC))
+                row = self.window_line * 256
+                self.window_line += 1
+                if WX < 0:
+                    line[:] = window[row - WX:row - WX + self.WIDTH]
+                else:
+                    line[WX:] = window[row:row + self.WIDTH - WX]
+
+        colours = line.translate(self.get_palette_table(registers[0xFF47]))
+
+        if LCDC & 0x02 and self.line_sprites[LY]:
+            colours = bytearray(colours)
+            self.draw_sprites(LY, line, colours)
+
+        offset = LY * self.WIDTH
+        self.framebuffer[offset:offset + self.WIDTH] = colours
+
+    # Translation table from shade to colour through a palette register
+    def get_palette_table(self, value):
+
+        table = self.palette_tables.get(value)
+        if table is None:
+            table = bytes([(value >> ((shade & 0x03) * 2)) & 0x03 for shade in range(0, 256)])
+            self.palette_tables[value] = table
+
+        return table
+
+    # Work out which sprites are on each line from OAM
+    # Like the hardware only the first 10 in OAM order count on a line, and they are kept in
+    # drawing priority order, lowest X first and then lowest OAM index
+    def index_sprites(self):
+
+        registers = self.memory.bytes
+        height = 16 if registers[0xFF40] & 0x04 else 8
+
+        line_sprites = [[] for i in range(0, self.HEIGHT)]
+        for index in range(0, 40):
+            address = 0xFE00 + index * 4
+            y = registers[address] - 16
+            x = registers[address + 1] - 8
+            sprite = (x, index, y, registers[address + 2], registers[address + 3], height)
+            for LY in range(max(y, 0), min(y + height, self.HEIGHT)):
+                if len(line_sprites[LY]) < 10:
+                    line_sprites[LY].append(sprite)
+
+        for sprites in line_sprites:
+            sprites.sort()
+        self.line_sprites = line_sprites
+
+    # Composite the sprites on line LY over its colours, line holds the background shades
+    def draw_sprites(self, LY, line, colours):
+
+        registers = self.memory.bytes
+
+        # Pixels already taken by a higher priority sprite
+        taken = bytearray(self.WIDTH)
+
+        for x, index, y, tile, flags, height in self.line_sprites[LY]:
+
+            row = LY - y
+            if flags & 0x40:
+                row = height - 1 - row
+            if height == 16:
+                tile = (tile & 0xFE) | (row >> 3)
+
+            shades = self.tile_row(tile, row & 0x07)
+            if flags & 0x20:
+                shades = shades[::-1]
+
+            palette = self.get_palette_table(registers[0xFF49] if flags & 0x10 else registers[0xFF48])
+            behind = flags & 0x80
+
+            for i in range(max(0, -x), min(8, self.WIDTH - x)):
+                shade = shades[i]
+                if shade == 0 or taken[x + i]:
+                    continue
+                taken[x + i] = 1
+
+                # With the priority flag set the sprite only shows over background shade 0
+                if behind and line[x + i]:
+                    continue
+                colours[x + i] = palette[shade]
+
+    # The 8 shades of one row of a decoded tile
+    def tile_row(self, tile, row):
+
+        if numpy is not None:
+            return self.tiles[tile, row].tobytes()
+        return self.tile_rows[tile][row]
+
+    # Composed map for a map select bit (LCDC bit 3 or 6) and the tile data select in LCDC bit 4
+    # Bit 0 of the key picks the map at 0x9C00 and bit 1 signed tile numbers at 0x8800
+    def map_key(self, map_select, LCDC):
+
+        return (1 if map_select else 0) | (0 if LCDC & 0x10 else 2)
+
+    # Redecode the tiles written since the last update, the composed maps are redrawn when next used
+    def update_tiles(self):
+
+        memory = self.memory
+
+        if numpy is not None:
+            dirty = numpy.flatnonzero(self.dirty_tiles)
+            if dirty.size:
+                # Each row of a tile is two bytes, the first holds the low bit of each pixel's shade
+                # and the second the high bit, most significant bit leftmost
+                bits = numpy.unpackbits(self.tile_data[dirty], axis=2)
+                self.tiles[dirty] = bits[:, :, :8] | (bits[:, :, 8:] << 1)
+        else:
+            self.decode_tiles()
+
+        memory.dirty_tiles[:] = CLEAN_TILES
+        memory.tile_map_dirty = False
+        self.stale_backgrounds[:] = b"\x01\x01\x01\x01"
+
+    # Composed map for a map_key, brought up to date if it is stale
+    def get_background(self, key):
+
+        if self.backgrounds[key] is None:
+            self.backgrounds[key] = bytearray(256 * 256)
+            if numpy is not None:
+                self.background_arrays[key] = numpy.frombuffer(self.backgrounds[key], dtype=numpy.uint8).reshape(256, 256)
+            else:
+                self.previous_rows[key] = [None] * 0x400
+            self.stale_backgrounds[key] = 1
+
+        if self.stale_backgrounds[key]:
+            self.stale_backgrounds[key] = 0
+            if numpy is not None:
+                self.compose_background(key)
+            else:
+                self.draw_background_tiles(key)
+
+        return self.backgrounds[key]
+
+    # Compose a whole map from the decoded tiles in a few array operations
+    def compose_background(self, key):
+
+        slots = self.tile_maps[key & 0x01]
+        if key & 0x02:
+            slots = self.signed_slots[slots]
+
+        # (32, 32, 8, 8) tiles laid out as 256x256 pixels
+        self.background_arrays[key][...] = self.tiles[slots].transpose(0, 2, 1, 3).reshape(256, 256)
+
+    # Redecode the dirty tiles a row at a time through the row lookup table
+    def decode_tiles(self):
+
+        vram = self.memory.bytes
+        dirty = self.memory.dirty_tiles
+        rows = self.rows
+
+        slot = dirty.find(1)
+        while slot != -1:
+            tile_data_index = 0x8000 + slot * 16
+            tile_rows = []
+            for i in range(0, 16, 2):
+                key = vram[tile_data_index + i] | (vram[tile_data_index + i + 1] << 8)
+                row = rows.get(key)
+                if row is None:
+                    row = self.decode_row(key)
+                tile_rows.append(row)
+            self.tile_rows[slot] = tile_rows
+            slot = dirty.find(1, slot + 1)
+
+    # Redraw the map positions whose tile was redecoded or changed since the map was last drawn
+    def draw_background_tiles(self, key):
+
+        vram = self.memory.bytes
+        base = 0x9C00 if key & 0x01 else 0x9800
+        slots = SIGNED_SLOTS if key & 0x02 else range(0, 0x100)
+        tile_rows = self.tile_rows
+        previous_rows = self.previous_rows[key]
+        background = self.backgrounds[key]
 
-                    n += 1
+        for index in range(0, 0x400):
 
-                # Copy each row from the tile into the background array
-                for y in range(0,8):
-                    for x in range(0,8):
-                        xindex = (index % 32) * 8 + x
-                        yindex = int(index / 32) * 8 + y
-                        self.background_pixels[xindex, yindex] = self.tile[y][x]
+            rows = tile_rows[slots[vram[base + index]]]
+            if previous_rows[index] is not rows:
+                previous_rows[index] = rows
 
-            # Make sure we update the previous tiles at least once
-            if self.first_render:
-                self.previous_tiles[index] = current_tile
+                offset = (index // 32) * 8 * 256 + (index % 32) * 8
+                for row in rows:
+                    background[offset:offset + 8] = row
+                    offset += 256
 
-        self.first_render = False
-        del self.background_pixels
-        self.screen.blit(self.background,(0, -1*self.memory.read(0xFF42)))
-        pygame.display.flip()
-        #gpu_thread = Thread(target=self.render)
-        #gpu_thread.start()
+    # Shades for a row of tile data, low byte in the low 8 bits of key
+    def decode_row(self, key):
 
+        low = key & 0xFF
+        high = key >> 8
 
+        row = bytes([(((high >> b) & 1) << 1) | ((low >> b) & 1) for b in range(7, -1, -1)])
 
+        self.rows[key] = row
+        return row
 
     def render(self):
 
-        self.screen.blit(self.background,(0,-1*self.memory.read(0xFF42)))
-        pygame.display.flip()
+        self.display.present(self.framebuffer, self.palette)
@@ -1,85 +1,57 @@
-import time
-
-from CPU import CPU
-from GPU import GPU
-from Memory import Memory
-
-RUNNING = True
-STEP = False
-
-# Memory Init
-Memory = Memory("TETRIS.gb")
-
-# CPU Init
-CPU = CPU(Memory)
-CPU.DEBUG = False
-
-# GPU Init, pass in the memory that has been initialized in the CPU
-GPU = GPU(Memory)
-
-time_display = time.clock()
-
-while RUNNING:
-
-    cycles_before = CPU.cycles
-    CPU.fetch()
-    if CPU.PC >= 0x100:
-        print("0x" + hex(CPU.PC)[2:].zfill(4).upper() + " : ", end="")
-        CPU.decode()
-        print(CPU.debug_string + "	",end="")
-        for i in range(0,CPU.instruction_length-1):
-            print(hex(CPU.args[i])[2:].zfill(2).upper() + " ", end="")
-        print("")
-        CPU.print_registers()
-        #input()
-    else:
-        CPU.decode()
-
-    CPU.execute()
-    cycles_after = CPU.cycles
-    cycles_passed = cycles_after - cycles_before
-    GPU.update(cycles_passed)
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-#
+import sys
+
+from Emulator import Emulator
+from Pacer import Pacer
+
+# Usage: python Main.py [rom_file] [--headless] [--trace] [--interpret] [--fast-forward] [--speed=N] [--stats]
+# --trace keeps the most recent instructions in a ring buffer and writes them to TRACE_FILE on exit,
+# view it with: python Tracer.py trace.bin
+# --interpret turns off the Recompiler and runs every instruction through the interpreter
+# --fast-forward runs as fast as possible, --speed=N runs at N times real time
+# --stats prints the frame timing and how many frames were skipped on exit
+ROM_FILE = "TETRIS.gb"
+TRACE_FILE = "trace.bin"
+
+def main():
+
+    RUNNING = True
+    STEP = False
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    rom_file = args[0] if args else ROM_FILE
+    headless = "--headless" in sys.argv
+
+    speed = 1.0
+    for arg in sys.argv[1:]:
+        if arg.startswith("--speed="):
+            speed = float(arg[len("--speed="):])
+
+    # Display Init, pygame is only loaded when there is a window to draw to
+    display = None
+    if not headless:
+        from Display import Display
+        display = Display()
+
+    emulator = Emulator(rom_file, display, recompile="--interpret" not in sys.argv)
+
+    if "--trace" in sys.argv:
+        from Tracer import Tracer
+        emulator.tracer = Tracer()
+
+    pacer = Pacer(speed, fast_forward="--fast-forward" in sys.argv)
+
+    try:
+        while RUNNING:
+            emulator.run_frames(1)
+            emulator.gpu.draw_frame = pacer.frame()
+    finally:
+        if emulator.tracer is not None:
+            emulator.tracer.dump(TRACE_FILE)
+        if display is not None:
+            display.close()
+        if "--stats" in sys.argv:
+            print("Frames: %d, skipped: %d, emulation: %.2fms, drawing: %.2fms" % (
+                pacer.frames, pacer.skipped_frames, pacer.emulation_time * 1000, pacer.render_time * 1000))
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,22 @@
 
 
+from Cartridge import Cartridge
+
+# Interrupt request bits in IF (0xFF0F) and IE (0xFFFF)
+INTERRUPT_VBLANK = 0x01
+INTERRUPT_STAT = 0x02
+INTERRUPT_TIMER = 0x04
+INTERRUPT_SERIAL = 0x08
+INTERRUPT_JOYPAD = 0x10
+
+# Set in Memory.interrupt_pending while an EI is waiting to take effect, and while the CPU is halted
+INTERRUPT_ENABLING = 0x100
+INTERRUPT_HALTED = 0x200
+
+# A page worth of empty decoded cache entries
+EMPTY_PAGE = [None] * 0x100
+
+
 class Memory:
 
 	def __init__(self, rom_file):
@@ -36,21 +53,314 @@ class Memory:
 			0x3e, 0x01, 0xe0, 0x50
 		]
 
+		# Backing store for the RAM and I/O pages
 		self.bytes = bytearray(0xFFFF+1)
 
-		file = open(rom_file, 'rb')
-		rom_bytes = bytearray(file.read())
+		# Page table with one entry per 256 byte page
+		# Plain ROM and RAM pages are memoryviews, so an access is a single index
+		# Pages where an access has side effects are HandlerPages
+		ram = memoryview(self.bytes)
+		self.read_pages = [None] * 0x100
+		self.write_pages = [None] * 0x100
+
+		# Writes to the ROM area go to the cartridge's bank controller
+		self.cartridge = Cartridge.load(rom_file)
+		for page in range(0x00, 0x80):
+			self.write_pages[page] = HandlerPage(page << 8, None, self.cartridge.write)
+
+		# VRAM, WRAM, echo and OAM, external RAM is mapped by the cartridge
+		for page in range(0x80, 0xFF):
+			self.read_pages[page] = self.write_pages[page] = ram[page << 8:(page + 1) << 8]
+
+		# Writes to VRAM are tracked so the GPU only redecodes what changed
+		for page in range(0x80, 0xA0):
+			self.write_pages[page] = HandlerPage(page << 8, None, self.write_vram)
+
+		# One flag per 16 byte tile in 0x8000-0x97FF, set when the tile's data is written
+		# Everything starts dirty so the first frame decodes it all
+		self.dirty_tiles = bytearray(b"\x01" * 384)
+		self.tile_map_dirty = True
+
+		# I/O registers and HRAM
+		self.read_pages[0xFF] = self.write_pages[0xFF] = HandlerPage(0xFF00, self.read_io, self.write_io)
+
+		# Timer behind 0xFF04-0xFF07, set by the Timer when it is made
+		self.timer = None
+
+		# Timed events, set by the Emulator, for OAM DMA to time the transfer
+		self.scheduler = None
 
-		for i in range(0, 256):
-			self.bytes[i] = self.BIOS[i]
+		# End of the OAM DMA transfer in progress, and the OAM pages it blocked
+		self.dma_event = None
+		self.dma_pages = None
 
-		for i in range(0, 32*1024-0x100):
-			self.bytes[0x100+i] = rom_bytes[0x100+i]
+		# Interrupt master enable (IME), set by EI and RETI and cleared by DI and when an interrupt is taken
+		self.interrupt_master_enable = False
+
+		# EI takes effect after the instruction that follows it, 1 until that instruction
+		# has started and 2 until it has finished
+		self.interrupt_enabling = 0
+
+		# Set by HALT and STOP until an interrupt request wakes the CPU, STOP only wakes for the joypad
+		self.halted = False
+		self.stopped = False
+
+		# Requested and enabled interrupts (IF & IE) while IME is set, with INTERRUPT_ENABLING
+		# while an EI is waiting and INTERRUPT_HALTED while halted, so the CPU has a single value
+		# to check between instructions
+		# Only recalculated when IF, IE, IME or the halt state change
+		self.interrupt_pending = 0
+
+		# The BIOS overlays 0x0000-0x00FF until it writes to 0xFF50
+		self.bios = memoryview(bytes(self.BIOS))
+		self.bios_mapped = True
+
+		# Decoded instruction cache used by the CPU, indexed by address
+		# Any write that changes code clears the entries that contain it
+		self.decoded = [None] * (0xFFFF+1)
+
+		# Pages that have had instructions decoded from them
+		self.decoded_pages = bytearray(0x100)
+
+		# Number of recompiled blocks covering each address
+		# Writing to a covered address tells the listener so it can drop the blocks
+		self.code = bytearray(0xFFFF+1)
+		self.code_listener = None
+
+		self.cartridge.attach(self)
 
 	def read(self, address):
 
-		return self.bytes[address]
+		return self.read_pages[address >> 8][address & 0xFF]
 
 	def write(self, address, data):
 
+		self.write_pages[address >> 8][address & 0xFF] = data
+
+	def read_io(self, address):
+
+		# DIV and TIMA are worked out from the clock when read
+		if address < 0xFF06 and address >= 0xFF04 and self.timer is not None:
+			return self.timer.read(address)
+
+		return self.bytes[address]
+
+	def write_vram(self, address, data):
+
+		self.write_code(address, data)
+
+		if address < 0x9800:
+			self.dirty_tiles[(address - 0x8000) >> 4] = 1
+		else:
+			self.tile_map_dirty = True
+
+	def write_io(self, address, data):
+
 		self.bytes[address] = data
+
+		# HRAM can hold code, the DMA routine runs from there
+		if address >= 0xFF80:
+			decoded = self.decoded
+			decoded[address] = decoded[address - 1] = decoded[address - 2] = None
+			if self.code[address]:
+				self.code_listener(address, address + 1)
+
+			if address == 0xFFFF:
+				self.update_interrupts()
+
+		elif address == 0xFF0F:
+			self.update_interrupts()
+
+		elif address >= 0xFF04 and address < 0xFF08 and self.timer is not None:
+			self.timer.write(address, data)
+
+		elif address == 0xFF46:
+			self.start_dma(data)
+
+		elif address == 0xFF50 and self.bios_mapped:
+			self.unmap_bios()
+
+	# OAM DMA, copies 0xA0 bytes from source * 0x100 to OAM
+	# The copy is done at once, then OAM reads 0xFF and ignores writes for the 640 clock cycles the
+	# transfer takes on hardware
+	def start_dma(self, source):
+
+		# Sources above WRAM read its echo
+		if source >= 0xE0:
+			source -= 0x20
+
+		page = self.read_pages[source]
+		if isinstance(page, HandlerPage):
+			data = bytes([page[offset] for offset in range(0, 0xA0)])
+		else:
+			data = page[0x00:0xA0]
+		self.bytes[0xFE00:0xFEA0] = data
+
+		if self.scheduler is None:
+			return
+
+		if self.dma_event is None:
+			self.dma_pages = (self.read_pages[0xFE], self.write_pages[0xFE])
+			self.read_pages[0xFE] = self.write_pages[0xFE] = HandlerPage(0xFE00, self.read_blocked, self.write_blocked)
+		else:
+			# Restarted before the last transfer finished
+			self.scheduler.cancel(self.dma_event)
+
+		self.dma_event = self.scheduler.schedule(self.scheduler.now() + 640, self.end_dma)
+
+	def end_dma(self, time):
+
+		self.read_pages[0xFE], self.write_pages[0xFE] = self.dma_pages
+		self.dma_event = None
+		self.dma_pages = None
+
+	# OAM while a DMA transfer is using it
+	def read_blocked(self, address):
+
+		return 0xFF
+
+	def write_blocked(self, address, data):
+
+		pass
+
+	# Write to a page that has had instructions decoded from it
+	def write_code(self, address, data):
+
+		self.read_pages[address >> 8][address & 0xFF] = data
+
+		# Instructions are up to 3 bytes long, drop any that contain this byte
+		decoded = self.decoded
+		decoded[address] = decoded[address - 1] = decoded[address - 2] = None
+
+		if self.code[address]:
+			self.code_listener(address, address + 1)
+
+	# Set an interrupt's request bit in IF, for the devices
+	def request_interrupt(self, interrupt):
+
+		self.bytes[0xFF0F] |= interrupt
+		self.update_interrupts()
+
+	# Recalculate interrupt_pending after IF, IE or IME changed
+	def update_interrupts(self):
+
+		pending = self.bytes[0xFF0F] & self.bytes[0xFFFF] & 0x1F if self.interrupt_master_enable else 0
+		if self.interrupt_enabling:
+			pending |= INTERRUPT_ENABLING
+		if self.halted:
+			pending |= INTERRUPT_HALTED
+		self.interrupt_pending = pending
+
+	# EI enables interrupts after the next instruction, RETI straight away
+	def enable_interrupts(self, delayed):
+
+		if delayed:
+			if not self.interrupt_master_enable:
+				self.interrupt_enabling = 1
+		else:
+			self.interrupt_master_enable = True
+			self.interrupt_enabling = 0
+		self.update_interrupts()
+
+	def disable_interrupts(self):
+
+		self.interrupt_master_enable = False
+		self.interrupt_enabling = 0
+		self.update_interrupts()
+
+	# HALT and STOP, the CPU stops running instructions until an interrupt is requested
+	def halt(self, stop):
+
+		self.halted = True
+		self.stopped = stop
+		self.update_interrupts()
+
+	# Whether a request has come in that wakes the CPU from HALT or STOP
+	# HALT wakes for any enabled interrupt whether or not IME is set
+	def wake_requested(self):
+
+		enabled = INTERRUPT_JOYPAD if self.stopped else self.bytes[0xFFFF]
+		return self.bytes[0xFF0F] & enabled & 0x1F != 0
+
+	def resume(self):
+
+		self.halted = False
+		self.stopped = False
+		self.update_interrupts()
+
+	# Called when the instruction at [start, end) is decoded
+	# Plain RAM pages are switched to write_code so the caches see later writes to them
+	def watch(self, start, end):
+
+		for page in range(start >> 8, ((end - 1) >> 8) + 1):
+			self.decoded_pages[page] = 1
+			if page >= 0x80 and page < 0xFF and not isinstance(self.write_pages[page], HandlerPage):
+				self.write_pages[page] = HandlerPage(page << 8, None, self.write_code)
+
+	# Map the pages of a 16KiB ROM bank at 0x0000 or 0x4000, called by the cartridge
+	def map_rom(self, address, pages):
+
+		first = address >> 8
+		self.read_pages[first:first + 0x40] = pages
+		if first == 0x00:
+			self.rom_page_zero = pages[0x00]
+			if self.bios_mapped:
+				self.read_pages[0x00] = self.bios
+
+		self.code_changed(address, address + 0x4000)
+
+	# Map the pages of an 8KiB external RAM bank at 0xA000, called by the cartridge
+	def map_ram(self, pages):
+
+		self.read_pages[0xA0:0xC0] = pages
+		self.write_pages[0xA0:0xC0] = pages
+		self.code_changed(0xA000, 0xC000)
+
+	# Route 0xA000-0xBFFF through handlers, for disabled RAM and the MBC3 clock
+	def map_ram_handlers(self, read, write):
+
+		for page in range(0xA0, 0xC0):
+			self.read_pages[page] = self.write_pages[page] = HandlerPage(page << 8, read, write)
+		self.code_changed(0xA000, 0xC000)
+
+	# Swap the cartridge ROM back in over the BIOS
+	def unmap_bios(self):
+
+		self.bios_mapped = False
+		self.read_pages[0x00] = self.rom_page_zero
+		self.code_changed(0x0000, 0x0100)
+
+	# Drop cached decodes and recompiled blocks for [start, end) after the memory there was remapped
+	# start and end are page aligned, only pages that were decoded from need clearing
+	def code_changed(self, start, end):
+
+		decoded = self.decoded
+		decoded_pages = self.decoded_pages
+		for page in range(start >> 8, end >> 8):
+			if decoded_pages[page]:
+				decoded[page << 8:(page + 1) << 8] = EMPTY_PAGE
+				decoded_pages[page] = 0
+
+		# Instructions are up to 3 bytes long, those just before start can reach into it
+		decoded[start - 1] = decoded[start - 2] = None
+
+		if self.code_listener is not None:
+			self.code_listener(start, end)
+
+
+# A page whose accesses have side effects, forwards them to handler functions
+class HandlerPage:
+
+	def __init__(self, base, read, write):
+
+		self.base = base
+		self.read = read
+		self.write = write
+
+	def __getitem__(self, offset):
+
+		return self.read(self.base + offset)
+
+	def __setitem__(self, offset, data):
+
+		self.write(self.base + offset, data)
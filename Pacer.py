@@ -0,0 +1,125 @@
+import time
+
+
+# Keeps the emulation to real time, called once at the end of every frame
+# In real time mode frames are spaced at the Game Boy's 59.73Hz, scaled by speed
+# In fast forward mode nothing waits and only enough frames are drawn to keep the window moving
+# When the host can't keep up, drawing is skipped on some frames so the game still runs at full speed
+class Pacer:
+
+    # A frame is 70224 clock cycles at 4194304Hz
+    FRAME_TIME = 70224 / 4194304
+
+    # Sleeping is only accurate to a millisecond or so, the last part of a wait is spent spinning
+    SPIN_TIME = 0.002
+
+    # Further behind than this and the pacer gives up catching up and carries on from now
+    MAX_LAG = 0.1
+
+    # Frames drawn per second of real time in fast forward
+    FAST_FORWARD_DRAW_RATE = 60
+
+    # Most frames skipped in a row, so something is always shown however slow the host is
+    MAX_SKIP = 4
+
+    # Weight of each new measurement in the running averages
+    SMOOTHING = 0.1
+
+    def __init__(self, speed=1.0, fast_forward=False, auto_skip=True):
+
+        self.speed = speed
+        self.fast_forward = fast_forward
+
+        # Whether frames are skipped when the host falls behind in real time mode
+        self.auto_skip = auto_skip
+
+        # When the current frame should end
+        self.deadline = time.perf_counter()
+
+        # When the next frame can be drawn in fast forward
+        self.next_draw = self.deadline
+
+        # When the current frame started running, and whether it is being drawn
+        self.frame_start = self.deadline
+        self.drawing = True
+
+        # Average seconds a frame takes with and without drawing, None until one has been timed
+        self.drawn_time = None
+        self.skipped_time = None
+
+        # Estimated seconds a frame takes to emulate, and on top of that to draw and present
+        self.emulation_time = 0.0
+        self.render_time = 0.0
+
+        # Telemetry, frames run, frames whose drawing was skipped and skips in a row
+        self.frames = 0
+        self.skipped_frames = 0
+        self.skipped_in_row = 0
+
+    # Wait until the frame that just finished is due to end
+    # Returns whether the next frame should be drawn
+    def frame(self):
+
+        now = time.perf_counter()
+        self.measure(now - self.frame_start)
+
+        if self.fast_forward:
+            self.deadline = now
+            draw = now >= self.next_draw
+            if draw:
+                self.next_draw = now + 1 / self.FAST_FORWARD_DRAW_RATE
+            return self.start_frame(draw)
+
+        budget = self.FRAME_TIME / self.speed
+        self.deadline += budget
+        if now - self.deadline > self.MAX_LAG:
+            self.deadline = now
+
+        # Draw the next frame if it can be emulated and drawn before it is due to end
+        draw = True
+        if self.auto_skip and self.skipped_in_row < self.MAX_SKIP:
+            draw = max(now, self.deadline) + self.emulation_time + self.render_time <= self.deadline + budget
+
+        remaining = self.deadline - now
+        if remaining > self.SPIN_TIME:
+            time.sleep(remaining - self.SPIN_TIME)
+        while time.perf_counter() < self.deadline:
+            pass
+
+        return self.start_frame(draw)
+
+    # Fold how long the frame that just finished took into the averages
+    def measure(self, elapsed):
+
+        self.frames += 1
+
+        if self.drawing:
+            self.drawn_time = self.average(self.drawn_time, elapsed)
+        else:
+            self.skipped_time = self.average(self.skipped_time, elapsed)
+
+        # Until a skipped frame has been timed, all of a drawn frame's time counts as emulation
+        if self.skipped_time is None:
+            self.emulation_time = self.drawn_time
+            return
+        self.emulation_time = self.skipped_time
+        if self.drawn_time is not None:
+            self.render_time = max(0.0, self.drawn_time - self.skipped_time)
+
+    def average(self, average, value):
+
+        if average is None:
+            return value
+        return average + (value - average) * self.SMOOTHING
+
+    def start_frame(self, draw):
+
+        if draw:
+            self.skipped_in_row = 0
+        else:
+            self.skipped_frames += 1
+            self.skipped_in_row += 1
+
+        self.drawing = draw
+        self.frame_start = time.perf_counter()
+        return draw
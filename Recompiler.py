@@ -0,0 +1,270 @@
+import inspect
+import re
+from textwrap import dedent
+
+from CPU import CB_SOURCES, FLAG_Z, FLAG_N, FLAG_H, FLAG_C
+
+
+# Registers that are held in locals inside a block, as r<name>
+REGISTERS = ["A", "F", "B", "C", "D", "E", "H", "L", "SP"]
+
+REGISTER = re.compile(r"self\.(A|F|B|C|D|E|H|L|SP|PC)\b")
+PUSH = re.compile(r"^(\s*)self\.PUSH\((.*)\)$")
+ACCESS = re.compile(r"\b(read|write)\(")
+
+# Straight text substitutions applied to handler source, in order
+REPLACEMENTS = [
+    ["self.get_AF()", "(((rA << 8) | rF) & 0xFFFF)"],
+    ["self.get_BC()", "(((rB << 8) | rC) & 0xFFFF)"],
+    ["self.get_DE()", "(((rD << 8) | rE) & 0xFFFF)"],
+    ["self.get_HL()", "(((rH << 8) | rL) & 0xFFFF)"],
+    ["self.read(", "read("],
+    ["self.write(", "write("],
+    ["self.cycles", "cycles"],
+    ["FLAG_Z", hex(FLAG_Z)],
+    ["FLAG_N", hex(FLAG_N)],
+    ["FLAG_H", hex(FLAG_H)],
+    ["FLAG_C", hex(FLAG_C)]
+]
+
+
+# Turn the source of a CPU handler into statements on register locals
+# The arguments are left as ARG0/ARG1 to be filled in per instruction
+# Returns None when the handler can not be inlined and has to be called instead
+def translate(source):
+
+    lines = dedent(source).strip("\n").split("\n")
+
+    statements = []
+    for line in dedent("\n".join(lines[1:])).split("\n"):
+
+        code = line.split("#")[0].rstrip()
+        if code.strip() == "":
+            continue
+        indent = code[:len(code) - len(code.lstrip())]
+
+        # Stack operations, same as CPU.PUSH and CPU.POP
+        match = PUSH.match(code)
+        if match:
+            statements.append(indent + "write(rSP, " + match.group(2) + ")")
+            statements.append(indent + "rSP -= 1")
+            continue
+        if "self.POP()" in code:
+            statements.append(indent + "rSP += 1")
+            code = code.replace("self.POP()", "read(rSP)")
+
+        statements.append(code)
+
+    text = "\n".join(statements)
+    for old, new in REPLACEMENTS:
+        text = text.replace(old, new)
+    text = text.replace("self.args[0]", "ARG0").replace("self.args[1]", "ARG1")
+    text = REGISTER.sub(r"r\1", text)
+
+    # Anything else on self (interrupt state, halting, the CB prefix) stays in the CPU
+    if re.search(r"\bself\b", text) or "while" in text or "return" in text:
+        return None
+
+    return inline_accesses(text)
+
+
+# Split a call's argument text at its top level commas
+def split_arguments(text):
+
+    arguments = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(text):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            arguments.append(text[start:i].strip())
+            start = i + 1
+    arguments.append(text[start:].strip())
+
+    return arguments
+
+
+# Replace read(x) and write(x, data) calls with the same page table lookups Memory.read and
+# Memory.write make, so a plain RAM or ROM access in a block is an index instead of a call
+def inline_accesses(text):
+
+    result = ""
+    position = 0
+    while True:
+
+        match = ACCESS.search(text, position)
+        if match is None:
+            return result + text[position:]
+
+        # Find the closing parenthesis of the call
+        depth = 1
+        end = match.end()
+        while depth:
+            if text[end] == "(":
+                depth += 1
+            elif text[end] == ")":
+                depth -= 1
+            end += 1
+        arguments = split_arguments(inline_accesses(text[match.end():end - 1]))
+
+        result += text[position:match.start()]
+        if match.group(1) == "read":
+            result += "read_pages[(address := " + arguments[0] + ") >> 8][address & 0xFF]"
+        else:
+            result += "write_pages[(address := " + arguments[0] + ") >> 8][address & 0xFF] = " + arguments[1]
+        position = end
+
+
+# Translates hot basic blocks into Python functions
+# A block runs from its start address up to and including the first instruction that can
+# change the PC, with the registers held in locals and the clock cycles charged once at exit
+class Recompiler:
+
+    # Block entries before a block is compiled
+    THRESHOLD = 32
+
+    # Longest block in instructions, keeps the GPU from falling too far behind
+    MAX_INSTRUCTIONS = 32
+
+    def __init__(self, cpu):
+
+        self.cpu = cpu
+        self.memory = cpu.memory
+
+        # Compiled block by start address, None to interpret
+        self.blocks = [None] * (0xFFFF+1)
+
+        # Times each address has been interpreted as the start of a block
+        self.heat = [0] * (0xFFFF+1)
+
+        # [start, end) of each compiled block by start address
+        self.ranges = {}
+
+        # Inlined statements by handler name, None for handlers that are called
+        self.translations = {}
+
+        self.memory.code_listener = self.invalidate
+
+    # Inlined statements for a handler, translated once
+    def translation(self, function):
+
+        name = function.__name__
+        if name not in self.translations:
+            if name in CB_SOURCES:
+                source = CB_SOURCES[name]
+            else:
+                source = inspect.getsource(function)
+            self.translations[name] = translate(source)
+
+        return self.translations[name]
+
+    # Compile the block starting at address, returns it or None if nothing could be compiled
+    def compile(self, address):
+
+        cpu = self.cpu
+        memory = self.memory
+
+        # Functions and argument lists the block calls directly, bound as default arguments
+        bound = {"cpu": cpu, "read_pages": memory.read_pages, "write_pages": memory.write_pages}
+
+        body = []
+        cycles = 0
+        count = 0
+        end = address
+        exits = False
+
+        while count < self.MAX_INSTRUCTIONS and end <= 0xFFFF:
+
+            entry = memory.decoded[end]
+            if entry is None:
+                entry = cpu.decode_instruction(end)
+            opcode, function, length, instruction_cycles, debug_string, args = entry
+
+            if opcode == 0xCB:
+                if end + 1 > 0xFFFF:
+                    break
+                function = cpu.CB_instructions[memory.read(end + 1)]
+                length = 2
+            elif function.__name__ in ["HALT", "STOP", "KILL"]:
+                break
+
+            next_address = end + length
+            statements = self.translation(function)
+
+            if statements is None:
+                # Call the handler with the CPU in sync, then pick the registers back up
+                handler = "handler_" + str(count)
+                bound[handler] = function
+                bound["args_" + str(count)] = args
+                body.append("FLUSH")
+                body.append("cpu.PC = " + hex(next_address))
+                body.append("cpu.args = args_" + str(count))
+                body.append(handler + "()")
+                body.append("RELOAD")
+                body.append("rPC = cpu.PC")
+                exits = True
+            else:
+                statements = statements.replace("ARG0", hex(args[0])).replace("ARG1", hex(args[1]))
+                if "rPC" in statements:
+                    body.append("rPC = " + hex(next_address))
+                body.append(statements)
+                exits = re.search(r"\brPC\s*[+-]?=", statements) is not None
+
+            cycles += instruction_cycles
+            count += 1
+            end = next_address
+
+            if exits:
+                break
+
+        if count == 0:
+            return None
+
+        if not exits:
+            body.append("rPC = " + hex(end))
+
+        # Only the registers the block touches are loaded and written back
+        text = "\n".join(body)
+        used = [register for register in REGISTERS if re.search(r"\br" + register + r"\b", text)]
+        load = "\n".join(["r" + register + " = cpu." + register for register in used])
+        store = "\n".join(["cpu." + register + " = r" + register for register in used])
+
+        source = text.replace("FLUSH", store).replace("RELOAD", load)
+        if load != "":
+            source = load + "\n" + source
+        source += "\ncpu.PC = rPC"
+        if store != "":
+            source += "\n" + store
+        source += "\ncpu.cycles += cycles"
+        source = "cycles = " + str(cycles) + "\n" + source
+
+        name = "block_" + hex(address)[2:].zfill(4).upper()
+        parameters = ", ".join([key + "=" + key for key in bound])
+        source = "def " + name + "(" + parameters + "):\n" + "\n".join(["\t" + line for line in source.split("\n")]) + "\n"
+
+        namespace = {}
+        exec(compile(source, "<" + name + ">", "exec"), bound, namespace)
+        block = namespace[name]
+
+        self.blocks[address] = block
+        self.ranges[address] = end
+        memory.watch(address, end)
+        for i in range(address, end):
+            memory.code[i] += 1
+
+        return block
+
+    # Drop every block that overlaps [start, end), called by Memory when code changes
+    def invalidate(self, start, end):
+
+        memory = self.memory
+        for address, block_end in list(self.ranges.items()):
+            if address < end and start < block_end:
+                del self.ranges[address]
+                self.blocks[address] = None
+                self.heat[address] = 0
+                for i in range(address, block_end):
+                    memory.code[i] -= 1
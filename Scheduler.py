@@ -0,0 +1,49 @@
+import heapq
+
+
+# Timed events for the devices, on the CPU's clock
+# Each device schedules a callback for the clock cycle its next change happens on, the run loop
+# only compares the clock with next_time after each instruction and runs the events that are due
+class Scheduler:
+
+    def __init__(self, cpu):
+
+        self.cpu = cpu
+
+        # Min-heap of [time, sequence, callback], the sequence keeps events due at the same
+        # time in the order they were scheduled
+        self.events = []
+        self.sequence = 0
+
+        # Time of the earliest event
+        self.next_time = float("inf")
+
+    # The current clock cycle
+    def now(self):
+
+        return self.cpu.cycles
+
+    # Call callback(time) once the clock reaches time, returns the event so it can be cancelled
+    def schedule(self, time, callback):
+
+        event = [time, self.sequence, callback]
+        self.sequence += 1
+        heapq.heappush(self.events, event)
+        self.next_time = self.events[0][0]
+        return event
+
+    # Cancelled events stay in the heap and are dropped when they come up
+    def cancel(self, event):
+
+        event[2] = None
+
+    # Run every event due by now, in time order, including any they schedule that are also due
+    def run(self, now):
+
+        events = self.events
+        while events and events[0][0] <= now:
+            time, sequence, callback = heapq.heappop(events)
+            if callback is not None:
+                callback(time)
+
+        self.next_time = events[0][0] if events else float("inf")
@@ -0,0 +1,89 @@
+from Memory import INTERRUPT_TIMER
+
+
+# DIV (0xFF04), TIMA (0xFF05), TMA (0xFF06) and TAC (0xFF07)
+# Nothing ticks, DIV and TIMA are worked out from the clock when they are read and the only event
+# is the next TIMA overflow, which is rescheduled whenever a write changes when it will happen
+class Timer:
+
+    # TIMA counts on every 1024, 16, 64 or 256 clock cycles of the divider by TAC bits 0-1,
+    # as the shift that turns the divider count into TIMA ticks
+    TAC_SHIFTS = [10, 4, 6, 8]
+
+    def __init__(self, memory, scheduler):
+
+        self.memory = memory
+        self.scheduler = scheduler
+
+        # Clock cycle the divider last read 0 on, DIV is the upper 8 bits of its 16 bit count
+        self.divider_start = scheduler.now()
+
+        # TIMA as of the clock cycle it was last brought up to date
+        self.TIMA = 0
+        self.synced = self.divider_start
+
+        self.enabled = False
+        self.shift = self.TAC_SHIFTS[0]
+
+        # The scheduled overflow, None while the timer is stopped
+        self.overflow_event = None
+
+        memory.timer = self
+
+    def read(self, address):
+
+        now = self.scheduler.now()
+        if address == 0xFF04:
+            return ((now - self.divider_start) >> 8) & 0xFF
+
+        self.sync(now)
+        return self.TIMA
+
+    # Called by Memory after the byte is stored
+    def write(self, address, data):
+
+        now = self.scheduler.now()
+        self.sync(now)
+
+        if address == 0xFF04:
+            # Any write resets the divider, which also restarts the current TIMA tick
+            self.divider_start = now
+        elif address == 0xFF05:
+            self.TIMA = data
+        elif address == 0xFF07:
+            self.enabled = data & 0x04 != 0
+            self.shift = self.TAC_SHIFTS[data & 0x03]
+        else:
+            # TMA is only used on the next overflow
+            return
+
+        self.schedule_overflow()
+
+    # Bring TIMA up to now, counting the ticks of the divider since it was last brought up to date
+    def sync(self, now):
+
+        if self.enabled:
+            shift = self.shift
+            self.TIMA += ((now - self.divider_start) >> shift) - ((self.synced - self.divider_start) >> shift)
+        self.synced = now
+
+    # Schedule the tick that takes TIMA past 0xFF
+    def schedule_overflow(self):
+
+        if self.overflow_event is not None:
+            self.scheduler.cancel(self.overflow_event)
+            self.overflow_event = None
+
+        if not self.enabled:
+            return
+
+        ticks = ((self.synced - self.divider_start) >> self.shift) + 0x100 - self.TIMA
+        self.overflow_event = self.scheduler.schedule(self.divider_start + (ticks << self.shift), self.overflow)
+
+    # TIMA is reloaded from TMA and the timer interrupt requested
+    def overflow(self, time):
+
+        self.synced = time
+        self.TIMA = self.memory.bytes[0xFF06]
+        self.memory.request_interrupt(INTERRUPT_TIMER)
+        self.schedule_overflow()
@@ -0,0 +1,114 @@
+import struct
+import sys
+
+from CPU import CPU
+
+
+# Binary ring buffer of executed instructions
+# Recording packs one fixed size record per instruction, formatting is left for offline use
+class Tracer:
+
+    # PC, opcode, length, 2 argument bytes, A F B C D E H L, SP, cycles
+    RECORD = struct.Struct("<HBBBBBBBBBBBBHQ")
+
+    def __init__(self, capacity=0x10000):
+
+        self.capacity = capacity
+        self.buffer = bytearray(self.RECORD.size * capacity)
+
+        # Next slot to write and the total number of records written
+        self.index = 0
+        self.total = 0
+
+    # Record the instruction that has just been decoded at PC
+    def record(self, cpu, PC):
+
+        args = cpu.args
+        if cpu.opcode == 0xCB:
+            # The CB opcode is read during execute, it is not an argument yet
+            arg0 = cpu.memory.read(PC + 1)
+        else:
+            arg0 = args[0]
+
+        self.RECORD.pack_into(self.buffer, self.index * self.RECORD.size,
+            PC, cpu.opcode, cpu.instruction_length, arg0, args[1],
+            cpu.A, cpu.F, cpu.B, cpu.C, cpu.D, cpu.E, cpu.H, cpu.L,
+            cpu.SP, cpu.cycles)
+
+        self.index += 1
+        if self.index == self.capacity:
+            self.index = 0
+        self.total += 1
+
+    # Records held in the buffer, oldest first
+    def records(self):
+
+        size = self.RECORD.size
+        if self.total > self.capacity:
+            data = self.buffer[self.index * size:] + self.buffer[:self.index * size]
+        else:
+            data = self.buffer[:self.index * size]
+
+        return list(self.RECORD.iter_unpack(data))
+
+    def clear(self):
+
+        self.index = 0
+        self.total = 0
+
+    # Write the held records to a file, oldest first
+    def dump(self, path):
+
+        size = self.RECORD.size
+        with open(path, "wb") as file:
+            if self.total > self.capacity:
+                file.write(self.buffer[self.index * size:])
+            file.write(self.buffer[:self.index * size])
+
+    @classmethod
+    def load(cls, path):
+
+        with open(path, "rb") as file:
+            data = file.read()
+
+        return list(cls.RECORD.iter_unpack(data))
+
+
+# Format a record the same way the old console trace did
+def format_record(record, instructions):
+
+    PC, opcode, length, arg0, arg1, A, F, B, C, D, E, H, L, SP, cycles = record
+
+    line = "0x" + hex(PC)[2:].zfill(4).upper() + " : " + instructions[opcode][3] + "\t"
+    if opcode == 0xCB:
+        line += hex(arg0)[2:].zfill(2).upper() + " "
+    else:
+        for arg in [arg0, arg1][:length - 1]:
+            line += hex(arg)[2:].zfill(2).upper() + " "
+
+    line += "\n    A=" + hex(A)[2:].zfill(2).upper()
+    line += " B=" + hex(B)[2:].zfill(2).upper()
+    line += " C=" + hex(C)[2:].zfill(2).upper()
+    line += " D=" + hex(D)[2:].zfill(2).upper()
+    line += " E=" + hex(E)[2:].zfill(2).upper()
+    line += " H=" + hex(H)[2:].zfill(2).upper()
+    line += " L=" + hex(L)[2:].zfill(2).upper()
+    line += "\n    SP=" + hex(SP)[2:].zfill(4).upper()
+    line += "\n    Z N H C"
+    line += "\n    " + str((F >> 7) & 1) + " " + str((F >> 6) & 1) + " " + str((F >> 5) & 1) + " " + str((F >> 4) & 1)
+    line += "\n    cycles=" + str(cycles)
+
+    return line
+
+# Pretty print a dumped trace
+# Usage: python Tracer.py trace_file
+def main():
+
+    # Only the instruction table is needed, the CPU never touches memory here
+    instructions = CPU(None).instructions
+
+    for record in Tracer.load(sys.argv[1]):
+        print(format_record(record, instructions))
+
+if __name__ == "__main__":
+    main()